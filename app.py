@@ -1,10 +1,155 @@
-from flask import Flask, jsonify, render_template, send_from_directory
-import json
+from flask import Flask, Response, jsonify, render_template, request, send_from_directory
+from werkzeug.security import safe_join
 import os
+import json_output
+import matchup_index
+import prewarm
+import shared_stream
 from whiff_watcher import WhiffWatcher
-from datetime import datetime
+from result_cache import ResultCache, DEFAULT_RESULT_TTL
+from metrics import Metrics
+from upstream import get_default_upstream
+from datetime import datetime, date
+from typing import Dict, Any, Iterator, Tuple, Optional
 
-app = Flask(__name__)
+# Static files go through download_file below rather than Flask's built-in static route
+app = Flask(__name__, static_folder=None)
+# No pretty-printing, even under debug=True
+app.json.compact = True
+
+def result_cache_key(full_slate: bool = False) -> str:
+    """Cache key for today's payload; the date rolls the key over at midnight"""
+    return f"{date.today().isoformat()}:{'full' if full_slate else 'default'}"
+
+def is_current_key(key: str) -> bool:
+    """Whether a cache key is today's; earlier days' entries are dropped once today's are stored"""
+    return key.startswith(f"{date.today().isoformat()}:")
+
+# Generated payloads are shared between requests; see result_cache.ResultCache
+result_cache = ResultCache(ttl=float(os.environ.get('WHIFF_CACHE_TTL', DEFAULT_RESULT_TTL)), retain=is_current_key)
+
+# Process-wide totals of every generation run, exposed on /metrics
+metrics_registry = Metrics()
+
+# Ranked, bucketed view of each cached payload for /api/matchups
+matchup_indexes = matchup_index.MatchupIndexCache(retain=is_current_key)
+
+# Long-lived incremental watchers, one per mode, so refreshes only refetch what changed.
+# The result cache's per-key lock keeps each watcher to one generation at a time.
+watchers = {
+    False: WhiffWatcher(incremental=True),
+    True: WhiffWatcher(full_slate=True, incremental=True)
+}
+
+def generate_data(full_slate: bool = False):
+    """Run the generation pipeline for the given mode"""
+    watcher = watchers[full_slate]
+    data = watcher.generate_whiff_watch_data()
+    metrics_registry.merge(watcher.metrics)
+    return data
+
+def warm_caches() -> Dict[str, Any]:
+    """Regenerate each pre-warmed mode into the result cache and republish the static files
+    
+    Raises if any mode failed; a failed run leaves the last good payload and files in place.
+    """
+    results = {}
+    failed = []
+    for full_slate in PREWARM_MODES:
+        key = result_cache_key(full_slate)
+        data = result_cache.refresh(key, lambda: generate_data(full_slate))
+        results[key] = {'total_ratings': len(data.get('whiff_watch_ratings', [])), 'error': bool(data.get('error'))}
+        if data.get('error'):
+            failed.append(f"{key}: {data.get('error_message')}")
+            continue
+        
+        # Build the query index now so the first query does not pay for it
+        matchup_indexes.get(key, data)
+        if not full_slate:
+            json_output.publish_static(data)
+    
+    if failed:
+        raise Exception('; '.join(failed))
+    return results
+
+def first_pitch_today() -> Optional[datetime]:
+    """Earliest start on today's schedule, from the schedule cache a warm run just filled"""
+    games = watchers[False].schedule_cache.lookup(date.today()) or []
+    starts = [game['game_datetime'] for game in games if game.get('game_datetime')]
+    if not starts:
+        return None
+    return min(datetime.fromisoformat(start.replace('Z', '+00:00')) for start in starts)
+
+# Modes kept warm by the scheduler; the default mode also republishes static/whiff_watch_data.json
+PREWARM_MODES = [False, True] if os.environ.get('WHIFF_PREWARM_FULL_SLATE', '').lower() in ('1', 'true', 'yes') else [False]
+
+# Refreshes ahead of demand; the interval stays inside the result cache TTL so entries never go stale
+prewarm_scheduler = prewarm.PrewarmScheduler(
+    warm_caches,
+    daily_times=prewarm.parse_times(os.environ.get('WHIFF_PREWARM_TIMES', prewarm.DEFAULT_PREWARM_TIMES)),
+    before_first_pitch=float(os.environ.get('WHIFF_PREWARM_BEFORE_FIRST_PITCH', prewarm.DEFAULT_BEFORE_FIRST_PITCH)),
+    interval=float(os.environ.get('WHIFF_PREWARM_INTERVAL', result_cache.ttl * 0.8)),
+    first_pitch=first_pitch_today
+)
+
+def start_prewarm():
+    """Start the pre-warm scheduler unless WHIFF_PREWARM=0"""
+    if os.environ.get('WHIFF_PREWARM', '1') != '0':
+        prewarm_scheduler.start()
+
+def full_slate_requested() -> bool:
+    """Whether the request asked for full-slate mode (?full_slate=1)"""
+    return request.args.get('full_slate', '').lower() in ('1', 'true', 'yes')
+
+# The streaming run in flight for each result cache key, shared by every client that asks meanwhile
+stream_runs = shared_stream.SharedStreams()
+
+def stream_events(full_slate: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(event, body) pairs for the streaming endpoint: one 'game' event per game, then 'summary'
+    
+    A fresh cached payload is replayed right away; otherwise the client joins the
+    streaming run in flight for the key (starting one if needed), which publishes
+    its payload to the result cache when it completes.
+    """
+    key = result_cache_key(full_slate)
+    cached = result_cache.peek(key)
+    if cached is not None:
+        return replay_events(cached)
+    return iter(stream_runs.join(key, lambda: stream_run(key, full_slate)))
+
+def replay_events(data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """A generated payload as the events a live run would have streamed"""
+    for event in WhiffWatcher.game_events(data):
+        yield 'game', event
+    yield 'summary', summary_fields(data)
+
+def stream_run(key: str, full_slate: bool) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stream a new run for key, holding the key's generation lock so batch requests wait for it"""
+    with result_cache.generating(key):
+        # A batch run may have published the payload while this one waited for the lock
+        cached = result_cache.peek(key)
+        if cached is not None:
+            yield from replay_events(cached)
+            return
+        
+        # A dedicated watcher, so streams never share run state with the cached watchers
+        watcher = WhiffWatcher(full_slate=full_slate)
+        for event, body in watcher.stream_whiff_watch_data():
+            if event == 'complete':
+                metrics_registry.merge(watcher.metrics)
+                if not body.get('error'):
+                    result_cache.put(key, body)
+                event, body = 'summary', summary_fields(body)
+            yield event, body
+
+def summary_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A payload without its matchup and player lists"""
+    return {key: value for key, value in data.items()
+            if key not in ('whiff_watch_ratings', 'active_batters', 'probable_pitchers', 'games')}
+
+def compact_requested() -> bool:
+    """Whether the request asked for the normalized payload (?format=compact)"""
+    return request.args.get('format', '').lower() == 'compact'
 
 @app.route('/')
 def index():
@@ -15,9 +160,9 @@ def index():
 def get_whiff_watch_data():
     """API endpoint to get current whiff watch data"""
     try:
-        watcher = WhiffWatcher()
-        data = watcher.generate_whiff_watch_data()
-        return jsonify(data)
+        full_slate = full_slate_requested()
+        data = result_cache.get(result_cache_key(full_slate), lambda: generate_data(full_slate))
+        return jsonify(json_output.compact_payload(data) if compact_requested() else data)
     except Exception as e:
         return jsonify({
             "error": "Failed to fetch whiff watch data",
@@ -25,24 +170,79 @@ def get_whiff_watch_data():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/api/matchups')
+def query_matchups():
+    """Top matchups filtered by rating level, team and game time, with cursor pagination
+    
+    Query parameters: level (comma-separated), team (team id), after / before
+    (ISO 8601 game start bounds), min_rating, limit and cursor (next_cursor of
+    the previous page).
+    """
+    try:
+        full_slate = full_slate_requested()
+        key = result_cache_key(full_slate)
+        data = result_cache.get(key, lambda: generate_data(full_slate))
+        page = matchup_indexes.get(key, data).query(
+            levels=matchup_index.parse_levels(request.args.get('level')),
+            team=request.args.get('team') or None,
+            after=matchup_index.parse_game_time(request.args.get('after')),
+            before=matchup_index.parse_game_time(request.args.get('before')),
+            min_rating=matchup_index.parse_rating(request.args.get('min_rating')),
+            limit=matchup_index.parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor') or None
+        )
+        return jsonify({
+            'generated_at': data.get('generated_at'),
+            'date': data.get('date'),
+            **page
+        })
+    except matchup_index.QueryError as e:
+        return jsonify({
+            "error": "Invalid matchup query",
+            "message": str(e),
+            "timestamp": datetime.now().isoformat()
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to query matchups",
+            "message": str(e),
+            "timestamp": datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/whiff-watch-stream')
+def stream_whiff_watch_data():
+    """Stream matchups game by game as NDJSON, or as server-sent events with ?format=sse"""
+    full_slate = full_slate_requested()
+    sse = (request.args.get('format', '').lower() == 'sse'
+           or request.accept_mimetypes.best == 'text/event-stream')
+    
+    def body():
+        for event, data in stream_events(full_slate):
+            if sse:
+                yield b'event: ' + event.encode() + b'\ndata: ' + json_output.encode(data) + b'\n\n'
+            else:
+                yield json_output.encode({'event': event, **data}) + b'\n'
+    
+    response = Response(body(), mimetype='text/event-stream' if sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ask reverse proxies not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/generate-json')
 def generate_json_file():
     """Generate and save JSON file for Bubble integration"""
     try:
-        watcher = WhiffWatcher()
-        data = watcher.generate_whiff_watch_data()
+        data = result_cache.refresh(result_cache_key(), generate_data)
         
-        # Ensure static directory exists
-        os.makedirs('static', exist_ok=True)
-        
-        # Save to static file for Bubble integration
-        with open('static/whiff_watch_data.json', 'w') as f:
-            json.dump(data, f, indent=2)
+        # Save to static files for Bubble integration
+        json_output.publish_static(data)
         
         return jsonify({
             "success": True,
             "message": "JSON file generated successfully",
-            "file_path": "/static/whiff_watch_data.json",
+            "file_path": f"/static/{json_output.DATA_FILE}",
+            "compact_file_path": f"/static/{json_output.COMPACT_DATA_FILE}",
             "total_ratings": len(data.get('whiff_watch_ratings', [])),
             "timestamp": data.get('generated_at')
         })
@@ -54,10 +254,67 @@ def generate_json_file():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/api/prewarm-status')
+def prewarm_status():
+    """Pre-warm scheduler configuration, next run and last run timing"""
+    return jsonify(prewarm_scheduler.status())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text endpoint with pipeline and result cache metrics"""
+    cache_stats = result_cache.stats()
+    lines = [metrics_registry.to_prometheus().rstrip('\n')]
+    for name in ('hits', 'stale_hits', 'misses'):
+        lines.append(f"# TYPE whiff_watcher_result_cache_{name}_total counter")
+        lines.append(f"whiff_watcher_result_cache_{name}_total {cache_stats[name]}")
+    lines.append("# TYPE whiff_watcher_result_cache_entries gauge")
+    lines.append(f"whiff_watcher_result_cache_entries {cache_stats['entries']}")
+    upstream_stats = get_default_upstream().stats()
+    lines.append("# TYPE whiff_watcher_upstream_retries_total counter")
+    lines.append(f"whiff_watcher_upstream_retries_total {upstream_stats['retries']}")
+    lines.append("# TYPE whiff_watcher_upstream_rejected_total counter")
+    lines.append(f"whiff_watcher_upstream_rejected_total {upstream_stats['rejected']}")
+    lines.append("# TYPE whiff_watcher_upstream_circuit_open gauge")
+    lines.append(f"whiff_watcher_upstream_circuit_open {0 if upstream_stats['circuit_state'] == 'closed' else 1}")
+    prewarm_stats = prewarm_scheduler.status()
+    lines.append("# TYPE whiff_watcher_prewarm_runs_total counter")
+    lines.append(f"whiff_watcher_prewarm_runs_total {prewarm_stats['runs']}")
+    lines.append("# TYPE whiff_watcher_prewarm_failures_total counter")
+    lines.append(f"whiff_watcher_prewarm_failures_total {prewarm_stats['failures']}")
+    if prewarm_stats['last_run']:
+        lines.append("# TYPE whiff_watcher_prewarm_last_duration_seconds gauge")
+        lines.append(f"whiff_watcher_prewarm_last_duration_seconds {prewarm_stats['last_run']['duration_seconds']}")
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 @app.route('/static/<path:filename>')
 def download_file(filename):
-    """Serve static files including the generated JSON"""
-    return send_from_directory('static', filename)
+    """Serve static files including the generated JSON
+    
+    JSON files are served from their precompressed variant when the client
+    accepts one, with a strong ETag so unchanged files revalidate with a 304.
+    """
+    path = safe_join(json_output.STATIC_DIR, filename)
+    if path is None or not filename.endswith('.json') or not os.path.isfile(path):
+        return send_from_directory(json_output.STATIC_DIR, filename)
+    
+    accepted = [encoding for encoding in json_output.ENCODINGS if request.accept_encodings.quality(encoding)]
+    f, encoding = json_output.open_variant(path, accepted)
+    try:
+        etag = json_output.file_etag(f)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(f.read(), mimetype='application/json')
+    finally:
+        f.close()
+    
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # Clients may keep the file but must revalidate it, which is cheap with the ETag
+    response.cache_control.no_cache = True
+    if encoding and response.status_code == 200:
+        response.content_encoding = encoding
+    return response
 
 @app.errorhandler(404)
 def not_found(error):
@@ -76,15 +333,9 @@ def internal_error(error):
     }), 500
 
 if __name__ == '__main__':
-    # Generate initial JSON file on startup
-    try:
-        watcher = WhiffWatcher()
-        data = watcher.generate_whiff_watch_data()
-        os.makedirs('static', exist_ok=True)
-        with open('static/whiff_watch_data.json', 'w') as f:
-            json.dump(data, f, indent=2)
-        print("Initial whiff watch data generated successfully")
-    except Exception as e:
-        print(f"Warning: Could not generate initial data: {e}")
+    # The scheduler's first run generates the initial data and JSON file in the background.
+    # Under the debug reloader only the serving child process runs it.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_prewarm()
     
     app.run(host='0.0.0.0', port=5000, debug=True)
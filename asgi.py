@@ -0,0 +1,138 @@
+"""ASGI entry point: serve Whiff Watcher from one event loop, e.g. `uvicorn asgi:app`
+
+The data routes run on AsyncWhiffWatcher, so concurrent dashboard clients and
+refreshes do not each hold a thread while waiting on StatsAPI. They share the
+result cache and metrics registry with the Flask app, which still serves every
+other route (through asgiref's WSGI adapter).
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Any
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import json_output
+from app import app as flask_app, result_cache, result_cache_key, metrics_registry, start_prewarm, prewarm_scheduler
+from async_whiff_watcher import AsyncWhiffWatcher, create_async_client
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+_client = None
+_watchers = {}
+_refreshing = {}
+
+def get_watcher(full_slate: bool = False) -> AsyncWhiffWatcher:
+    """Long-lived incremental watcher per mode, sharing one HTTP client"""
+    global _client
+    if _client is None:
+        _client = create_async_client()
+    if full_slate not in _watchers:
+        _watchers[full_slate] = AsyncWhiffWatcher(full_slate=full_slate, incremental=True, client=_client)
+    return _watchers[full_slate]
+
+async def _regenerate(key: str, full_slate: bool):
+    watcher = get_watcher(full_slate)
+    data = await watcher.agenerate_whiff_watch_data()
+    metrics_registry.merge(watcher.metrics)
+    result_cache.put(key, data)
+
+def start_refresh(full_slate: bool = False) -> asyncio.Task:
+    """Start regenerating today's payload into the result cache, or join the regeneration already running"""
+    key = result_cache_key(full_slate)
+    task = _refreshing.get(key)
+    if task is None:
+        task = asyncio.create_task(_regenerate(key, full_slate))
+        _refreshing[key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(key, None))
+    return task
+
+async def get_payload(full_slate: bool = False) -> Dict[str, Any]:
+    """Today's payload with the same stale-while-revalidate behaviour as ResultCache.get"""
+    key = result_cache_key(full_slate)
+    cached = result_cache.peek(key, allow_stale=True, allow_error=True)
+    if cached is not None:
+        if cached['metadata']['cache']['status'] == 'stale':
+            start_refresh(full_slate)
+        return cached
+
+    # Shielded so a client disconnecting does not cancel a generation others are waiting on
+    await asyncio.shield(start_refresh(full_slate))
+    return result_cache.current(key, 'miss')
+
+def query_flag(params: Dict[str, list], name: str) -> bool:
+    return params.get(name, [''])[0].lower() in ('1', 'true', 'yes')
+
+async def send_json(send, data: Dict[str, Any], status: int = 200):
+    body = json_output.encode(data)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def whiff_watch_data(params: Dict[str, list], send):
+    """Async version of /api/whiff-watch-data"""
+    try:
+        data = await get_payload(query_flag(params, 'full_slate'))
+        if params.get('format', [''])[0].lower() == 'compact':
+            data = json_output.compact_payload(data)
+        await send_json(send, data)
+    except Exception as e:
+        await send_json(send, {
+            "error": "Failed to fetch whiff watch data",
+            "message": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, 500)
+
+async def generate_json(params: Dict[str, list], send):
+    """Async version of /api/generate-json"""
+    try:
+        await asyncio.shield(start_refresh())
+        data = result_cache.current(result_cache_key(), 'refresh')
+        await asyncio.to_thread(json_output.publish_static, data)
+        await send_json(send, {
+            "success": True,
+            "message": "JSON file generated successfully",
+            "file_path": f"/static/{json_output.DATA_FILE}",
+            "compact_file_path": f"/static/{json_output.COMPACT_DATA_FILE}",
+            "total_ratings": len(data.get('whiff_watch_ratings', [])),
+            "timestamp": data.get('generated_at')
+        })
+    except Exception as e:
+        await send_json(send, {
+            "success": False,
+            "error": "Failed to generate JSON file",
+            "message": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, 500)
+
+routes = {
+    '/api/whiff-watch-data': whiff_watch_data,
+    '/api/generate-json': generate_json
+}
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            start_prewarm()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            prewarm_scheduler.stop()
+            if _client is not None:
+                await _client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    handler = routes.get(scope.get('path')) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+    if handler is None:
+        await wsgi_app(scope, receive, send)
+        return
+    await handler(parse_qs(scope.get('query_string', b'').decode('latin-1')), send)
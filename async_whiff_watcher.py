@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:  # only the async watcher needs httpx; WhiffWatcher runs on requests
+    httpx = None
+
+from whiff_watcher import WhiffWatcher, REQUEST_HEADERS, REQUEST_TIMEOUT, SESSION_POOL_SIZE
+
+ASYNC_MAX_CONNECTIONS = SESSION_POOL_SIZE
+
+def create_async_client(max_connections: int = ASYNC_MAX_CONNECTIONS) -> 'httpx.AsyncClient':
+    """Async HTTP client with a capped connection pool; retries are left to the upstream client"""
+    if httpx is None:
+        raise RuntimeError("AsyncWhiffWatcher requires the httpx package")
+    return httpx.AsyncClient(
+        headers=REQUEST_HEADERS,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+
+class AsyncWhiffWatcher(WhiffWatcher):
+    """WhiffWatcher whose upstream requests go through httpx instead of worker threads
+
+    The pipeline is WhiffWatcher's own (agenerate_whiff_watch_data(),
+    astream_whiff_watch_data()); only the transport differs. The client's pool caps
+    connections across every run sharing it, so one event loop can serve many
+    concurrent generations. An httpx client belongs to the loop it was first used
+    on, so calls made on any other loop (the synchronous wrappers run their own)
+    fall back to the requests session.
+    """
+
+    def __init__(self, *args, client: Optional['httpx.AsyncClient'] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+        self._owns_client = client is None
+        self._client_loop = None
+
+    async def aclose(self):
+        """Close the HTTP client if this watcher created it"""
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            self._client_loop = None
+
+    async def _aget(self, url: str, endpoint: str) -> 'httpx.Response':
+        """Issue a GET through the async client, recording it under endpoint"""
+        loop = asyncio.get_running_loop()
+        if self._client_loop is None:
+            self._client_loop = loop
+        elif self._client_loop is not loop:
+            return await super()._aget(url, endpoint)
+        if self.client is None:
+            self.client = create_async_client()
+
+        async with self._limiter():
+            started = time.perf_counter()
+            try:
+                response = await self.upstream.aget(self.client, url, REQUEST_TIMEOUT, self._deadline)
+            except Exception as e:
+                self._record_upstream_failure(endpoint, time.perf_counter() - started, e)
+                raise
+        self._record_upstream_response(endpoint, time.perf_counter() - started, response.status_code)
+        return response
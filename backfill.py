@@ -0,0 +1,121 @@
+"""Generate whiff watch data for a range of dates, for backtesting the rating
+
+Dates are processed in parallel on a process pool, and each date's payload is
+written to its own file as soon as it finishes, with one summary line appended
+to index.jsonl, so memory use does not grow with the length of the range. Dates
+that already have an output file are skipped unless --overwrite is given, so an
+interrupted run can resume.
+
+Workers open a stats cache of their own, by default player_stats.sqlite3 in the
+output directory, so backfills never evict the app's live entries. Historical
+stat lines are keyed by the day before their date, so they are reused when a
+date is regenerated with --overwrite, not across dates.
+
+Example:
+    python backfill.py 2024-03-28 2024-09-29 --season 2024 --processes 4 --output backfill
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from stats_cache import StatsCache
+from whiff_watcher import WhiffWatcher
+
+DEFAULT_OUTPUT_DIR = 'backfill'
+STATS_CACHE_FILE = 'player_stats.sqlite3'
+
+_worker_stats_cache = None
+
+def _init_worker(stats_cache_path: str):
+    """Open this worker's connection to the backfill stats cache"""
+    global _worker_stats_cache
+    _worker_stats_cache = StatsCache(stats_cache_path)
+
+def output_path(output_dir: str, game_date: date) -> str:
+    return os.path.join(output_dir, f"whiff_watch_{game_date.isoformat()}.json")
+
+def generate_for_date(game_date: date, season: Optional[int], output_dir: str, full_slate: bool,
+                      max_workers: int) -> Dict[str, Any]:
+    """Generate and save one date's payload, returning only a small summary"""
+    watcher = WhiffWatcher(max_workers=max_workers, stats_cache=_worker_stats_cache, full_slate=full_slate,
+                           game_date=game_date, season=season)
+    data = watcher.generate_whiff_watch_data()
+
+    path = output_path(output_dir, game_date)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+    return {
+        'date': game_date.isoformat(),
+        'file': path,
+        'error': bool(data.get('error')),
+        'error_message': data.get('error_message'),
+        'total_whiff_ratings': data['data_summary'].get('total_whiff_ratings', 0),
+        'seconds': data.get('metrics', {}).get('stage_seconds', {}).get('total')
+    }
+
+def run_backfill(start: date, end: date, season: Optional[int] = None, output_dir: str = DEFAULT_OUTPUT_DIR,
+                 processes: Optional[int] = None, full_slate: bool = False, max_workers: int = 4,
+                 stats_cache_path: Optional[str] = None, overwrite: bool = False) -> List[Dict[str, Any]]:
+    """Generate one payload per date from start to end inclusive; returns the per-date summaries"""
+    os.makedirs(output_dir, exist_ok=True)
+    if stats_cache_path is None:
+        stats_cache_path = os.path.join(output_dir, STATS_CACHE_FILE)
+    dates = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    if not overwrite:
+        dates = [d for d in dates if not os.path.exists(output_path(output_dir, d))]
+    if not dates:
+        print("Nothing to backfill")
+        return []
+
+    # Spawned workers start clean instead of inheriting the parent's sockets and locks
+    context = multiprocessing.get_context('spawn')
+    summaries = []
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker,
+                             initargs=(stats_cache_path,)) as pool, \
+            open(os.path.join(output_dir, 'index.jsonl'), 'a') as index:
+        futures = {
+            pool.submit(generate_for_date, d, season, output_dir, full_slate, max_workers): d for d in dates
+        }
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'date': futures[future].isoformat(), 'error': True, 'error_message': str(e)}
+            index.write(json.dumps(summary) + '\n')
+            index.flush()
+            summaries.append(summary)
+            print(f"[{len(summaries)}/{len(dates)}] {summary['date']}: "
+                  f"{'error - ' + str(summary.get('error_message')) if summary['error'] else summary['total_whiff_ratings']}")
+
+    return sorted(summaries, key=lambda s: s['date'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill whiff watch data for a date range")
+    parser.add_argument('start', help="first date (YYYY-MM-DD)")
+    parser.add_argument('end', help="last date (YYYY-MM-DD), inclusive")
+    parser.add_argument('--season', type=int, help="season year (default: the year of each date)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help="directory for per-date JSON files")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--max-workers', type=int, default=4, help="concurrent requests per process")
+    parser.add_argument('--full-slate', action='store_true', help="rate every hitter on every roster")
+    parser.add_argument('--stats-cache', default=None,
+                        help=f"SQLite stats cache path (default: {STATS_CACHE_FILE} in the output directory)")
+    parser.add_argument('--overwrite', action='store_true', help="regenerate dates that already have output")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d').date()
+    end = datetime.strptime(args.end, '%Y-%m-%d').date()
+    summaries = run_backfill(start, end, args.season, args.output, args.processes, args.full_slate,
+                             args.max_workers, args.stats_cache, args.overwrite)
+    failed = sum(1 for s in summaries if s['error'])
+    print(f"Backfilled {len(summaries) - failed} dates ({failed} failed) into {args.output}")
+
+if __name__ == '__main__':
+    main()
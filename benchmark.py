@@ -0,0 +1,357 @@
+"""Offline benchmark harness for the whiff watch generation pipeline
+
+StatsAPI responses are replayed from a fixture file through a requests transport
+adapter, with optional injected latency and error rates, so runs are repeatable
+and never touch the live API. Fixtures can be recorded from the live API
+(--record) or synthesized from the whiff_watch_data.json snapshot (the default).
+
+Examples:
+    python benchmark.py --games 1,5,10,15 --full-slate --latency 0.05 --output bench.json
+    python benchmark.py --compare bench.json
+    python benchmark.py --record fixtures/statsapi.json
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from whiff_watcher import WhiffWatcher, ScheduleCache, REQUEST_HEADERS
+from upstream import UpstreamClient
+
+SNAPSHOT_PATH = 'whiff_watch_data.json'
+ROSTER_HITTERS = 13
+ROSTER_PITCHERS = 13
+
+class StatsAPIFixtures:
+    """Recorded StatsAPI data, stored by entity so any batched request can be answered
+
+    Layout: schedule (raw /schedule JSON), rosters (team id -> raw roster JSON),
+    people (group -> player id -> hydrated person JSON) and leaders (raw JSON).
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.schedule = data['schedule']
+        self.rosters = {str(k): v for k, v in data['rosters'].items()}
+        self.people = {group: {str(k): v for k, v in people.items()} for group, people in data['people'].items()}
+        self.leaders = data.get('leaders', {'leaderCategories': []})
+
+    @classmethod
+    def load(cls, path: str) -> 'StatsAPIFixtures':
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({
+                'schedule': self.schedule,
+                'rosters': self.rosters,
+                'people': self.people,
+                'leaders': self.leaders
+            }, f)
+
+    @classmethod
+    def from_snapshot(cls, path: str = SNAPSHOT_PATH, seed: int = 2025) -> 'StatsAPIFixtures':
+        """Synthesize fixtures shaped like the games and players in a generated payload
+
+        Snapshot players keep their real stats; each roster is padded with
+        deterministic filler hitters and pitchers up to a full 26-man roster.
+        """
+        with open(path) as f:
+            snapshot = json.load(f)
+        rng = random.Random(seed)
+
+        team_names, games = {}, {}
+        for pitcher in snapshot['probable_pitchers']:
+            team_id, opponent_id = int(pitcher['team_abbreviation']), int(pitcher['opponent_abbreviation'])
+            team_names[team_id] = pitcher['team']
+            team_names.setdefault(opponent_id, pitcher['opponent'])
+            home_id, away_id = (team_id, opponent_id) if pitcher['is_home'] else (opponent_id, team_id)
+            game = games.setdefault((home_id, away_id, pitcher['game_time']), {'home': None, 'away': None})
+            game['home' if pitcher['is_home'] else 'away'] = pitcher
+
+        people = {'hitting': {}, 'pitching': {}}
+        schedule_games = []
+        for game_pk, ((home_id, away_id, game_time), starters) in enumerate(sorted(games.items(), key=lambda g: g[0][2])):
+            teams = {}
+            for side, team_id in (('home', home_id), ('away', away_id)):
+                teams[side] = {'team': {'id': team_id, 'name': team_names.get(team_id, f"Team {team_id}")}}
+                starter = starters[side]
+                if starter:
+                    teams[side]['probablePitcher'] = {'id': starter['player_id'], 'fullName': starter['name']}
+                    people['pitching'][str(starter['player_id'])] = _person(
+                        starter['player_id'], starter['name'],
+                        {'battersFaced': starter['batters_faced'], 'strikeOuts': starter['strikeouts']}
+                    )
+            schedule_games.append({
+                'gamePk': 800000 + game_pk,
+                'gameDate': game_time,
+                'status': {'detailedState': 'Scheduled', 'abstractGameState': 'Preview'},
+                'teams': teams
+            })
+
+        rosters = {}
+        batters_by_team = {}
+        for batter in snapshot['active_batters']:
+            batters_by_team.setdefault(int(batter['team_abbreviation']), []).append(batter)
+        for team_id in sorted(team_names):
+            roster = []
+            for batter in batters_by_team.get(team_id, []):
+                roster.append(_roster_entry(batter['player_id'], batter['name'], batter['position']))
+                people['hitting'][str(batter['player_id'])] = _person(
+                    batter['player_id'], batter['name'], {'atBats': batter['at_bats'], 'strikeOuts': batter['strikeouts']}
+                )
+            for n in range(len(roster), ROSTER_HITTERS):
+                player_id = team_id * 1000 + n
+                at_bats = rng.randint(20, 320)
+                roster.append(_roster_entry(player_id, f"Hitter {team_id}-{n}", rng.choice(['C', '1B', '2B', 'SS', '3B', 'LF', 'CF', 'RF', 'DH'])))
+                people['hitting'][str(player_id)] = _person(
+                    player_id, f"Hitter {team_id}-{n}", {'atBats': at_bats, 'strikeOuts': int(at_bats * rng.uniform(0.12, 0.36))}
+                )
+            for n in range(ROSTER_PITCHERS):
+                player_id = team_id * 1000 + 500 + n
+                roster.append(_roster_entry(player_id, f"Pitcher {team_id}-{n}", 'P'))
+            rosters[str(team_id)] = {'teamId': team_id, 'roster': roster}
+
+        leaders = {'leaderCategories': [{'leaders': [
+            {'person': {'id': int(pid), 'fullName': person['fullName']}}
+            for pid, person in list(people['hitting'].items())[:100]
+        ]}]}
+
+        return cls({
+            'schedule': {'dates': [{'date': snapshot.get('date', ''), 'games': schedule_games}]},
+            'rosters': rosters,
+            'people': people,
+            'leaders': leaders
+        })
+
+def _person(player_id: int, name: str, stat: Dict[str, Any]) -> Dict[str, Any]:
+    return {'id': player_id, 'fullName': name, 'stats': [{'splits': [{'stat': stat}]}]}
+
+def _roster_entry(player_id: int, name: str, position: str) -> Dict[str, Any]:
+    return {'person': {'id': player_id, 'fullName': name}, 'position': {'abbreviation': position}}
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that answers StatsAPI requests from fixtures
+
+    latency seconds (plus up to jitter seconds) are slept per request, and a
+    fraction error_rate of requests fail with HTTP 503. games trims the
+    schedule to the first N games.
+    """
+
+    def __init__(self, fixtures: StatsAPIFixtures, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, games: Optional[int] = None, seed: int = 0):
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.games = games
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        body = None if failed else self._route(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.status_code = 503 if failed else (200 if body is not None else 404)
+        response._content = json.dumps(body if body is not None else {}).encode()
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def close(self):
+        pass
+
+    def _route(self, url: str) -> Optional[Dict[str, Any]]:
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+
+        if path.endswith('/schedule'):
+            schedule = json.loads(json.dumps(self.fixtures.schedule))
+            if self.games is not None:
+                for schedule_date in schedule.get('dates', []):
+                    schedule_date['games'] = schedule_date['games'][:self.games]
+            return schedule
+
+        roster = re.search(r'/teams/(\d+)/roster', path)
+        if roster:
+            return self.fixtures.rosters.get(roster.group(1))
+
+        if path.endswith('/people') and 'personIds' in query:
+            group = 'pitching' if 'group=[pitching]' in query.get('hydrate', [''])[0] else 'hitting'
+            people = self.fixtures.people.get(group, {})
+            return {'people': [people[pid] for pid in query['personIds'][0].split(',') if pid in people]}
+
+        if path.endswith('/stats/leaders'):
+            return self.fixtures.leaders
+        return None
+
+def record_fixtures(path: str):
+    """Record today's live StatsAPI responses for the full slate into a fixture file"""
+    recorded = {'schedule': None, 'rosters': {}, 'people': {'hitting': {}, 'pitching': {}}, 'leaders': None}
+
+    class RecordingAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            response = super().send(request, **kwargs)
+            if response.status_code == 200:
+                parsed = urlparse(request.url)
+                query = parse_qs(parsed.query)
+                body = response.json()
+                roster = re.search(r'/teams/(\d+)/roster', parsed.path)
+                if parsed.path.endswith('/schedule'):
+                    recorded['schedule'] = body
+                elif roster:
+                    recorded['rosters'][roster.group(1)] = body
+                elif parsed.path.endswith('/people'):
+                    group = 'pitching' if 'group=[pitching]' in query.get('hydrate', [''])[0] else 'hitting'
+                    for person in body.get('people', []):
+                        recorded['people'][group][str(person['id'])] = person
+                elif parsed.path.endswith('/stats/leaders'):
+                    recorded['leaders'] = body
+            return response
+
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    session.mount('https://', RecordingAdapter())
+    watcher = WhiffWatcher(session=session, schedule_cache=ScheduleCache(), use_stats_cache=False, full_slate=True)
+    watcher.generate_whiff_watch_data()
+
+    if recorded['schedule'] is None:
+        raise RuntimeError("Schedule could not be recorded")
+    StatsAPIFixtures(recorded).save(path)
+    print(f"Recorded fixtures for {sum(len(d['games']) for d in recorded['schedule'].get('dates', []))} games to {path}")
+
+def run_case(fixtures: StatsAPIFixtures, games: int, full_slate: bool, repeats: int, latency: float,
+             jitter: float, error_rate: float, max_workers: int) -> Dict[str, Any]:
+    """Time the whole pipeline and each stage for one slate size and mode"""
+    totals, stages, upstream_requests, matchups = [], {}, [], []
+    for repeat in range(repeats):
+        adapter = ReplayAdapter(fixtures, latency, jitter, error_rate, games, seed=repeat)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        # A fresh upstream client per run so breaker state does not leak between cases; the replay is not rate limited
+        watcher = WhiffWatcher(max_workers=max_workers, session=session, schedule_cache=ScheduleCache(),
+                               use_stats_cache=False, full_slate=full_slate, upstream=UpstreamClient(rate=float('inf')))
+
+        started = time.perf_counter()
+        data = watcher.generate_whiff_watch_data()
+        totals.append(time.perf_counter() - started)
+
+        for stage, seconds in data['metrics']['stage_seconds'].items():
+            stages.setdefault(stage, []).append(seconds)
+        upstream_requests.append(adapter.requests)
+        matchups.append(len(data.get('whiff_watch_ratings', [])))
+
+    return {
+        'games': games,
+        'mode': 'full_slate' if full_slate else 'default',
+        'repeats': repeats,
+        'total_seconds': {
+            'min': round(min(totals), 4),
+            'median': round(statistics.median(totals), 4),
+            'max': round(max(totals), 4)
+        },
+        'stage_seconds': {stage: round(statistics.median(values), 4) for stage, values in sorted(stages.items())},
+        'upstream_requests': int(statistics.median(upstream_requests)),
+        'matchups': int(statistics.median(matchups))
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Print median total time deltas between two result files"""
+    previous = {(r['mode'], r['games']): r for r in baseline['results']}
+    print(f"{'mode':<11}{'games':>6}{'before':>10}{'after':>10}{'change':>9}")
+    for result in current['results']:
+        key = (result['mode'], result['games'])
+        after = result['total_seconds']['median']
+        if key in previous:
+            before = previous[key]['total_seconds']['median']
+            change = f"{(after - before) / before * 100:+.1f}%" if before else 'n/a'
+            print(f"{key[0]:<11}{key[1]:>6}{before:>10.4f}{after:>10.4f}{change:>9}")
+        else:
+            print(f"{key[0]:<11}{key[1]:>6}{'-':>10}{after:>10.4f}{'new':>9}")
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark whiff watch generation against recorded StatsAPI fixtures")
+    parser.add_argument('--fixtures', help="fixture file to replay (default: synthesized from the snapshot)")
+    parser.add_argument('--record', metavar='PATH', help="record live StatsAPI responses to PATH and exit")
+    parser.add_argument('--games', default='1,5,10,15', help="comma separated slate sizes")
+    parser.add_argument('--full-slate', action='store_true', help="also benchmark full-roster mode")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help="injected seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds per request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--output', help="write machine-readable results to this JSON file")
+    parser.add_argument('--compare', metavar='PATH', help="compare against an earlier results file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return
+
+    fixtures = StatsAPIFixtures.load(args.fixtures) if args.fixtures else StatsAPIFixtures.from_snapshot()
+    modes = [False, True] if args.full_slate else [False]
+
+    results = []
+    for full_slate in modes:
+        for games in (int(n) for n in args.games.split(',')):
+            result = run_case(fixtures, games, full_slate, args.repeats, args.latency, args.jitter,
+                              args.error_rate, args.max_workers)
+            results.append(result)
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {
+            'fixtures': args.fixtures or f"snapshot:{SNAPSHOT_PATH}",
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+            'max_workers': args.max_workers,
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+
+    print(f"{'mode':<11}{'games':>6}{'median_s':>10}{'requests':>10}{'matchups':>10}")
+    for result in results:
+        print(f"{result['mode']:<11}{result['games']:>6}{result['total_seconds']['median']:>10.4f}"
+              f"{result['upstream_requests']:>10}{result['matchups']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional, Tuple, BinaryIO
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped when the package is missing
+    brotli = None
+
+STATIC_DIR = 'static'
+DATA_FILE = 'whiff_watch_data.json'
+COMPACT_DATA_FILE = 'whiff_watch_compact.json'
+
+COMPACT_FORMAT_VERSION = 1
+MATCHUP_FIELDS = ['matchup_id', 'pitcher_id', 'batter_id', 'whiff_watch_rating', 'rating_level', 'game_info']
+
+# Content-Encoding -> file suffix of the precompressed variant, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'} if brotli else {'gzip': '.gz'}
+
+MAX_CACHED_ETAGS = 256
+
+# Keeps concurrent publishes in this process from interleaving one payload's variants with another's
+_publish_lock = threading.Lock()
+
+def encode(data: Dict[str, Any]) -> bytes:
+    """Serialize a payload without whitespace; much smaller and faster than indent=2"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def compact_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized form of a payload: each player once, matchups as rows referring to players by id
+
+    batters and pitchers are tables keyed by player id, and every matchup is a
+    row of MATCHUP_FIELDS values. Summary, metadata and metrics are unchanged.
+    """
+    compact = {
+        key: value for key, value in data.items()
+        if key not in ('whiff_watch_ratings', 'active_batters', 'probable_pitchers')
+    }
+    compact['format'] = 'compact'
+    compact['format_version'] = COMPACT_FORMAT_VERSION
+
+    batters = {}
+    pitchers = {}
+    for batter in data.get('active_batters', []):
+        batters[str(batter['player_id'])] = batter
+    for pitcher in data.get('probable_pitchers', []):
+        pitchers[str(pitcher['player_id'])] = pitcher
+
+    rows = []
+    for matchup in data.get('whiff_watch_ratings', []):
+        pitcher, batter = matchup['pitcher'], matchup['batter']
+        # Matchups normally reference listed players; keep any that do not
+        pitchers.setdefault(str(pitcher['player_id']), pitcher)
+        batters.setdefault(str(batter['player_id']), batter)
+        rows.append([
+            matchup['matchup_id'], pitcher['player_id'], batter['player_id'],
+            matchup['whiff_watch_rating'], matchup['rating_level'], matchup.get('game_info')
+        ])
+
+    compact['batters'] = batters
+    compact['pitchers'] = pitchers
+    compact['matchup_fields'] = MATCHUP_FIELDS
+    compact['matchups'] = rows
+    return compact
+
+def write_json(path: str, data: Dict[str, Any]) -> List[str]:
+    """Write a payload and its precompressed variants, each replaced atomically; returns the paths written"""
+    body = encode(data)
+    variants = [(path + suffix, _compress(body, encoding)) for encoding, suffix in ENCODINGS.items()]
+    # The plain file goes last so a reader that sees it never finds older compressed variants
+    variants.append((path, body))
+    for variant_path, content in variants:
+        _write_atomic(variant_path, content)
+    return [variant_path for variant_path, _ in variants]
+
+def publish_static(data: Dict[str, Any], static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Write the full and compact payload files for Bubble and the dashboard"""
+    os.makedirs(static_dir, exist_ok=True)
+    full_path = os.path.join(static_dir, DATA_FILE)
+    compact_path = os.path.join(static_dir, COMPACT_DATA_FILE)
+    compact = compact_payload(data)
+    with _publish_lock:
+        write_json(full_path, data)
+        write_json(compact_path, compact)
+    return {'full': full_path, 'compact': compact_path}
+
+def open_variant(path: str, accepted: List[str]) -> Tuple[BinaryIO, Optional[str]]:
+    """Open the best precompressed variant of path the client accepts; returns (file, content encoding)"""
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted:
+            try:
+                return open(path + suffix, 'rb'), encoding
+            except OSError:
+                continue
+    return open(path, 'rb'), None
+
+_etags = {}
+_etags_lock = threading.Lock()
+
+def file_etag(f: BinaryIO) -> str:
+    """Strong ETag of an open file, hashed once per file version (inode, mtime and size)"""
+    key = _file_key(os.fstat(f.fileno()))
+    with _etags_lock:
+        etag = _etags.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+        f.seek(0)
+        etag = _remember_etag(key, digest)
+    return etag
+
+def _file_key(st: os.stat_result) -> tuple:
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _remember_etag(key: tuple, digest) -> str:
+    etag = digest.hexdigest()[:32]
+    with _etags_lock:
+        if len(_etags) >= MAX_CACHED_ETAGS:
+            _etags.clear()
+        _etags[key] = etag
+    return etag
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+def _write_atomic(path: str, content: bytes):
+    # A unique temp file per write, so concurrent publishes never write into each other's file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            # mkstemp creates the file owner-only; published files are world-readable
+            os.fchmod(f.fileno(), 0o644)
+            # os.replace keeps inode and mtime, so the ETag can be primed before the file is visible
+            _remember_etag(_file_key(os.fstat(f.fileno())), hashlib.sha256(content))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
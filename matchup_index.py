@@ -0,0 +1,184 @@
+import base64
+import heapq
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from itertools import islice, takewhile
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator
+
+from rating_engine import RATING_LEVELS
+
+DEFAULT_QUERY_LIMIT = 50
+MAX_QUERY_LIMIT = 500
+
+class QueryError(ValueError):
+    """A query parameter that cannot be used; reported to the client as a 400"""
+
+class MatchupIndex:
+    """Read-only index over one generation's matchups for filtered top-K queries
+
+    Matchups are ranked once by rating (ties by matchup id, then game time, which
+    tells a pitcher's doubleheader games apart), and each rating
+    level, team id and game start time keeps the ranks of its matchups in
+    order. A query merges the smallest matching set of buckets lazily with a
+    heap and stops once it has a page, so its cost follows the page size, not
+    the slate. Cursors name the last matchup returned (its full sort key), so
+    they keep working after the index is rebuilt for a newer generation.
+    """
+
+    def __init__(self, matchups: List[Dict[str, Any]]):
+        self.matchups = sorted(matchups, key=self._sort_key)
+        self._keys = [self._sort_key(matchup) for matchup in self.matchups]
+        self.by_level = {}
+        self.by_team = {}
+        self.by_game_time = {}
+        for rank, matchup in enumerate(self.matchups):
+            self.by_level.setdefault(matchup['rating_level'], []).append(rank)
+            for team in {str(matchup['pitcher']['team_abbreviation']), str(matchup['batter']['team_abbreviation'])}:
+                self.by_team.setdefault(team, []).append(rank)
+            self.by_game_time.setdefault(matchup['pitcher'].get('game_time', ''), []).append(rank)
+        self._game_times = sorted(self.by_game_time)
+
+    def __len__(self) -> int:
+        return len(self.matchups)
+
+    def query(self, levels: Optional[Iterable[str]] = None, team: Optional[str] = None,
+              after: Optional[str] = None, before: Optional[str] = None, min_rating: Optional[float] = None,
+              limit: int = DEFAULT_QUERY_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """The highest-rated matchups passing every given filter, one page at a time
+
+        levels are rating levels, team a numeric team id matching either side,
+        and after/before bound the game start time (UTC, after inclusive, before
+        exclusive). The result holds the page and a next_cursor, None on the last page.
+        """
+        level_set = None if levels is None else set(levels)
+        team = None if team is None else str(team)
+        candidates = []
+        if level_set is not None:
+            candidates.append([self.by_level.get(level, []) for level in level_set])
+        if team is not None:
+            candidates.append([self.by_team.get(team, [])])
+        if after is not None or before is not None:
+            start = 0 if after is None else bisect_left(self._game_times, after)
+            end = len(self._game_times) if before is None else bisect_left(self._game_times, before)
+            candidates.append([self.by_game_time[game_time] for game_time in self._game_times[start:end]])
+
+        first = 0 if cursor is None else bisect_right(self._keys, self._decode_cursor(cursor))
+        if candidates:
+            # Scan the smallest candidate set; the other filters are checked per matchup
+            ranks = self._merged(min(candidates, key=lambda buckets: sum(len(bucket) for bucket in buckets)), first)
+            ranks = (rank for rank in ranks if self._matches(self.matchups[rank], level_set, team, after, before))
+        else:
+            ranks = iter(range(first, len(self.matchups)))
+        if min_rating is not None:
+            # Ranks come highest rating first, so the scan ends at the first one below min_rating
+            ranks = takewhile(lambda rank: -self._keys[rank][0] >= min_rating, ranks)
+
+        page = list(islice(ranks, limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        return {
+            'matchups': [self.matchups[rank] for rank in page],
+            'count': len(page),
+            'next_cursor': self._encode_cursor(self._keys[page[-1]]) if has_more else None
+        }
+
+    @staticmethod
+    def _matches(matchup: Dict[str, Any], level_set: Optional[set], team: Optional[str],
+                 after: Optional[str], before: Optional[str]) -> bool:
+        if level_set is not None and matchup['rating_level'] not in level_set:
+            return False
+        if team is not None and team not in (str(matchup['pitcher']['team_abbreviation']),
+                                             str(matchup['batter']['team_abbreviation'])):
+            return False
+        game_time = matchup['pitcher'].get('game_time', '')
+        return (after is None or game_time >= after) and (before is None or game_time < before)
+
+    @staticmethod
+    def _merged(buckets: List[List[int]], first: int) -> Iterator[int]:
+        """Ranks from several sorted buckets in order, starting at rank first"""
+        return heapq.merge(*(islice(bucket, bisect_left(bucket, first), None) for bucket in buckets))
+
+    @staticmethod
+    def _sort_key(matchup: Dict[str, Any]) -> tuple:
+        return (-matchup['whiff_watch_rating'], matchup['matchup_id'], matchup['pitcher'].get('game_time', ''))
+
+    @staticmethod
+    def _encode_cursor(key: tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps([-key[0], key[1], key[2]]).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        try:
+            rating, matchup_id, game_time = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            return (-float(rating), str(matchup_id), str(game_time))
+        except Exception:
+            raise QueryError(f"Invalid cursor: {cursor}")
+
+def parse_levels(value: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated rating levels, case-insensitive"""
+    if not value:
+        return None
+    levels = [level.strip().upper() for level in value.split(',') if level.strip()]
+    unknown = [level for level in levels if level not in RATING_LEVELS]
+    if unknown:
+        raise QueryError(f"Unknown rating level(s) {', '.join(unknown)}; expected {', '.join(reversed(RATING_LEVELS))}")
+    return levels
+
+def parse_game_time(value: Optional[str]) -> Optional[str]:
+    """An ISO 8601 timestamp as the UTC form StatsAPI uses for game times; naive times are taken as UTC"""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise QueryError(f"Invalid time {value}; expected ISO 8601, e.g. 2025-06-29T23:00:00Z")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def parse_limit(value: Optional[str]) -> int:
+    if not value:
+        return DEFAULT_QUERY_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise QueryError(f"Invalid limit {value}")
+    if not 1 <= limit <= MAX_QUERY_LIMIT:
+        raise QueryError(f"limit must be between 1 and {MAX_QUERY_LIMIT}")
+    return limit
+
+def parse_rating(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"Invalid min_rating {value}")
+
+class MatchupIndexCache:
+    """The index for the latest payload of each result cache key, rebuilt only when the payload changes
+
+    Indexes whose key fails retain(key) are dropped whenever one is built.
+    """
+
+    def __init__(self, retain: Optional[Callable[[str], bool]] = None):
+        self.retain = retain
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, data: Dict[str, Any]) -> MatchupIndex:
+        ratings = data.get('whiff_watch_ratings', [])
+        with self._lock:
+            cached = self._indexes.get(key)
+        # Payloads served from the result cache share their matchup list until regenerated
+        if cached is not None and cached[0] is ratings:
+            return cached[1]
+
+        index = MatchupIndex(ratings)
+        with self._lock:
+            self._indexes[key] = (ratings, index)
+            if self.retain is not None:
+                self._indexes = {key: entry for key, entry in self._indexes.items() if self.retain(key)}
+        return index
@@ -0,0 +1,171 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any
+
+# Upper bounds (seconds) of the upstream latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """Pipeline instrumentation: stage wall time, upstream calls, cache hit rates and errors"""
+
+    enabled = True
+
+    def __init__(self):
+        self.runs = 0
+        self.stage_seconds = {}
+        self.requests = {}
+        self.request_errors = {}
+        self.latency_sum = {}
+        self.latency_buckets = {}
+        self.cache_hits = {}
+        self.cache_misses = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage; repeated stages accumulate"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+
+    def record_request(self, endpoint: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.latency_sum[endpoint] = self.latency_sum.get(endpoint, 0.0) + seconds
+            buckets = self.latency_buckets.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+            buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if not ok:
+                self.request_errors[endpoint] = self.request_errors.get(endpoint, 0) + 1
+
+    def record_cache(self, cache: str, hits: int = 0, misses: int = 0):
+        with self._lock:
+            self.cache_hits[cache] = self.cache_hits.get(cache, 0) + hits
+            self.cache_misses[cache] = self.cache_misses.get(cache, 0) + misses
+
+    def record_error(self, stage: str):
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def merge(self, other: 'Metrics'):
+        """Fold another (per-run) metrics object into this one"""
+        if not other.enabled:
+            return
+        with other._lock:
+            snapshot = {
+                'stage_seconds': dict(other.stage_seconds),
+                'requests': dict(other.requests),
+                'request_errors': dict(other.request_errors),
+                'latency_sum': dict(other.latency_sum),
+                'latency_buckets': {k: list(v) for k, v in other.latency_buckets.items()},
+                'cache_hits': dict(other.cache_hits),
+                'cache_misses': dict(other.cache_misses),
+                'errors': dict(other.errors)
+            }
+        with self._lock:
+            self.runs += 1
+            for endpoint, counts in snapshot.pop('latency_buckets').items():
+                buckets = self.latency_buckets.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+                for i, count in enumerate(counts):
+                    buckets[i] += count
+            for name, values in snapshot.items():
+                totals = getattr(self, name)
+                for key, value in values.items():
+                    totals[key] = totals.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            upstream = {}
+            for endpoint, count in self.requests.items():
+                cumulative, histogram = 0, {}
+                for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), self.latency_buckets[endpoint]):
+                    cumulative += bucket_count
+                    histogram['+Inf' if bound == float('inf') else str(bound)] = cumulative
+                upstream[endpoint] = {
+                    'requests': count,
+                    'errors': self.request_errors.get(endpoint, 0),
+                    'total_seconds': round(self.latency_sum[endpoint], 4),
+                    'avg_seconds': round(self.latency_sum[endpoint] / count, 4),
+                    'latency_histogram': histogram
+                }
+
+            caches = {}
+            for cache in set(self.cache_hits) | set(self.cache_misses):
+                hits, misses = self.cache_hits.get(cache, 0), self.cache_misses.get(cache, 0)
+                caches[cache] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0
+                }
+
+            return {
+                'stage_seconds': {name: round(seconds, 4) for name, seconds in self.stage_seconds.items()},
+                'upstream_requests_total': sum(self.requests.values()),
+                'upstream': upstream,
+                'caches': caches,
+                'errors': dict(self.errors)
+            }
+
+    def to_prometheus(self, prefix: str = 'whiff_watcher') -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                suffix = f"{{{label_text}}}" if label_text else ''
+                lines.append(f"{prefix}_{name}{suffix} {value}")
+
+        with self._lock:
+            family('runs_total', 'counter', 'Generation runs recorded.', [({}, self.runs)])
+            family('stage_seconds_total', 'counter', 'Wall time spent per pipeline stage.',
+                   [({'stage': k}, round(v, 6)) for k, v in sorted(self.stage_seconds.items())])
+            family('upstream_requests_total', 'counter', 'Upstream StatsAPI requests per endpoint.',
+                   [({'endpoint': k}, v) for k, v in sorted(self.requests.items())])
+            family('upstream_errors_total', 'counter', 'Failed upstream requests per endpoint.',
+                   [({'endpoint': k}, v) for k, v in sorted(self.request_errors.items())])
+
+            lines.append(f"# HELP {prefix}_upstream_request_seconds Upstream request latency.")
+            lines.append(f"# TYPE {prefix}_upstream_request_seconds histogram")
+            for endpoint in sorted(self.latency_buckets):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.latency_buckets[endpoint]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else str(bound)
+                    lines.append(f'{prefix}_upstream_request_seconds_bucket{{endpoint="{endpoint}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_upstream_request_seconds_sum{{endpoint="{endpoint}"}} {round(self.latency_sum[endpoint], 6)}')
+                lines.append(f'{prefix}_upstream_request_seconds_count{{endpoint="{endpoint}"}} {self.requests[endpoint]}')
+
+            family('cache_hits_total', 'counter', 'Cache hits per cache.',
+                   [({'cache': k}, v) for k, v in sorted(self.cache_hits.items())])
+            family('cache_misses_total', 'counter', 'Cache misses per cache.',
+                   [({'cache': k}, v) for k, v in sorted(self.cache_misses.items())])
+            family('errors_total', 'counter', 'Pipeline errors per stage.',
+                   [({'stage': k}, v) for k, v in sorted(self.errors.items())])
+
+        return '\n'.join(lines) + '\n'
+
+class NullMetrics(Metrics):
+    """Metrics stand-in that records nothing, for when instrumentation is disabled"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def record_request(self, endpoint: str, seconds: float, ok: bool = True):
+        pass
+
+    def record_cache(self, cache: str, hits: int = 0, misses: int = 0):
+        pass
+
+    def record_error(self, stage: str):
+        pass
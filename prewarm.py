@@ -0,0 +1,149 @@
+import threading
+import time
+from datetime import datetime, time as dtime, timedelta
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+DEFAULT_PREWARM_TIMES = '04:30,11:00'  # overnight after the last games go final, and when lineups post
+DEFAULT_BEFORE_FIRST_PITCH = 60  # minutes
+MAX_SLEEP = 60  # seconds; the schedule is re-evaluated at least this often
+
+def parse_times(value: str) -> List[dtime]:
+    """Comma-separated HH:MM local times"""
+    return sorted(dtime.fromisoformat(part.strip()) for part in value.split(',') if part.strip())
+
+class PrewarmScheduler:
+    """Background thread that runs warm() ahead of demand
+
+    Runs happen once at start, at local midnight (when the result cache key
+    rolls over to the new date), at each daily time (server local time), a fixed
+    number of minutes before the day's first pitch, and every interval seconds
+    after the previous run finished (0 disables each). Keeping interval below
+    the result cache TTL means user requests are always served from the cache.
+    warm() raises on failure; first_pitch() returns the first start time on
+    today's schedule, if known, and is consulted after every run.
+    """
+
+    def __init__(self, warm: Callable[[], Dict[str, Any]], daily_times: Optional[List[dtime]] = None,
+                 before_first_pitch: float = DEFAULT_BEFORE_FIRST_PITCH, interval: float = 0,
+                 first_pitch: Optional[Callable[[], Optional[datetime]]] = None):
+        self.warm = warm
+        self.daily_times = parse_times(DEFAULT_PREWARM_TIMES) if daily_times is None else daily_times
+        self.before_first_pitch = before_first_pitch
+        self.interval = interval
+        self.first_pitch = first_pitch
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self._first_pitch = None
+        self._anchor = None  # start of the last run
+        self._last_finished = None
+        self._next = None
+        self._in_progress = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the scheduler thread; the first run happens right away"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='prewarm-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_now(self, reason: str = 'manual') -> Dict[str, Any]:
+        """Run warm() in the calling thread, after any run already in progress; returns the run record"""
+        with self._run_lock:
+            started = datetime.now()
+            with self._lock:
+                self._anchor = started
+                self._in_progress = True
+            started_clock = time.perf_counter()
+            record = {'reason': reason, 'started_at': started.isoformat()}
+            try:
+                record['results'] = self.warm()
+                record['success'] = True
+            except Exception as e:
+                print(f"Pre-warm run ({reason}) failed: {e}")
+                record['success'] = False
+                record['error'] = str(e)
+            record['finished_at'] = datetime.now().isoformat()
+            record['duration_seconds'] = round(time.perf_counter() - started_clock, 3)
+
+            first_pitch = self._lookup_first_pitch()
+            with self._lock:
+                self.runs += 1
+                self.failures += 0 if record['success'] else 1
+                self.last_run = record
+                self._last_finished = datetime.now()
+                self._in_progress = False
+                if first_pitch is not None:
+                    self._first_pitch = first_pitch
+            return record
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            next_run = self._next
+            return {
+                'enabled': self._thread is not None and self._thread.is_alive(),
+                'in_progress': self._in_progress,
+                'daily_times': [t.strftime('%H:%M') for t in self.daily_times],
+                'before_first_pitch_minutes': self.before_first_pitch,
+                'interval_seconds': self.interval,
+                'first_pitch': self._first_pitch.isoformat() if self._first_pitch else None,
+                'next_run': {'at': next_run[0].isoformat(), 'reason': next_run[1]} if next_run else None,
+                'runs': self.runs,
+                'failures': self.failures,
+                'last_run': self.last_run
+            }
+
+    def next_run(self) -> Tuple[datetime, str]:
+        """When the next run is due and why; a time in the past means now"""
+        with self._lock:
+            anchor, last_finished, first_pitch = self._anchor, self._last_finished, self._first_pitch
+        if anchor is None:
+            return datetime.now(), 'startup'
+
+        # The new day's cache key is empty until something generates it
+        candidates = [(datetime.combine(anchor.date() + timedelta(days=1), dtime.min), 'date rollover')]
+        if self.interval:
+            candidates.append((last_finished + timedelta(seconds=self.interval), 'interval'))
+        for day in (anchor.date(), anchor.date() + timedelta(days=1)):
+            for daily_time in self.daily_times:
+                at = datetime.combine(day, daily_time)
+                if at > anchor:
+                    candidates.append((at, f"daily {daily_time.strftime('%H:%M')}"))
+        if first_pitch is not None and self.before_first_pitch:
+            at = first_pitch - timedelta(minutes=self.before_first_pitch)
+            if at > anchor:
+                candidates.append((at, 'before first pitch'))
+        return min(candidates)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            at, reason = self.next_run()
+            with self._lock:
+                self._next = (at, reason)
+            remaining = (at - datetime.now()).total_seconds()
+            if remaining > 0:
+                # Short sleeps so clock changes and a newly known first pitch are picked up
+                self._stop.wait(min(remaining, MAX_SLEEP))
+                continue
+            self.run_now(reason)
+
+    def _lookup_first_pitch(self) -> Optional[datetime]:
+        """Today's first pitch in naive local time, comparable with datetime.now()"""
+        if self.first_pitch is None:
+            return None
+        try:
+            first_pitch = self.first_pitch()
+        except Exception as e:
+            print(f"Could not determine first pitch: {e}")
+            return None
+        if first_pitch is not None and first_pitch.tzinfo is not None:
+            first_pitch = first_pitch.astimezone().replace(tzinfo=None)
+        return first_pitch
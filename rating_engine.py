@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+# Lower bounds of each rating level, lowest first; see WhiffWatcher.get_rating_level
+RATING_BINS = [-np.inf, 30, 40, 50, 60, np.inf]
+RATING_LEVELS = ['MINIMAL', 'LOW', 'MODERATE', 'HIGH', 'EXTREME']
+
+def players_frame(players: List[Any], team_field: str = 'team_abbreviation') -> pd.DataFrame:
+    """Columnar view of a list of player records: position in the list, team key and strikeout rate"""
+    return pd.DataFrame({
+        'idx': np.arange(len(players), dtype=np.int64),
+        'team': [str(getattr(p, team_field)) for p in players],
+        'rate': np.array([p.strikeout_rate for p in players], dtype=np.float64)
+    })
+
+def pair_by_opponent(pitchers: pd.DataFrame, batters: pd.DataFrame,
+                     batters_per_pitcher: Optional[int] = None) -> pd.DataFrame:
+    """Pair every pitcher row with the first batters of its opponent's team (all of them when None)
+
+    pitchers needs idx, opponent and rate columns; batters comes from players_frame.
+    """
+    pairs = pitchers[['idx', 'opponent', 'rate']].merge(
+        batters[['idx', 'team', 'rate']], left_on='opponent', right_on='team', suffixes=('_pitcher', '_batter')
+    )
+    pairs = pairs.sort_values(['idx_pitcher', 'idx_batter'], kind='stable')
+    if batters_per_pitcher is None:
+        return pairs
+    return pairs.groupby('idx_pitcher', sort=False).head(batters_per_pitcher)
+
+def pair_across_teams(pitchers: pd.DataFrame, batters: pd.DataFrame, batters_per_pitcher: int) -> pd.DataFrame:
+    """Pair every pitcher with the first batters who are not on the pitcher's team"""
+    pairs = pitchers[['idx', 'team', 'rate']].merge(
+        batters[['idx', 'team', 'rate']], how='cross', suffixes=('_pitcher', '_batter')
+    )
+    pairs = pairs[pairs['team_pitcher'] != pairs['team_batter']]
+    pairs = pairs.sort_values(['idx_pitcher', 'idx_batter'], kind='stable')
+    return pairs.groupby('idx_pitcher', sort=False).head(batters_per_pitcher)
+
+def rate_pairs(pairs: pd.DataFrame) -> pd.DataFrame:
+    """Add rating and level columns and order pairs by rating, highest first
+
+    Ties keep their pairing order, matching a stable sort over the same rows.
+    """
+    pairs = pairs.copy()
+    pairs['rating'] = np.round(pairs['rate_batter'].to_numpy() + pairs['rate_pitcher'].to_numpy(), 2)
+    pairs['level'] = rating_levels(pairs['rating'])
+    return pairs.sort_values('rating', ascending=False, kind='stable')
+
+def rating_levels(ratings: pd.Series) -> pd.Series:
+    """Categorize ratings into levels in one pass"""
+    return pd.cut(ratings, bins=RATING_BINS, labels=RATING_LEVELS, right=False).astype(str)
+
+def summarize(ratings: pd.DataFrame) -> Dict[str, Any]:
+    """Summary statistics for a frame with rating and level columns"""
+    total = len(ratings)
+    if not total:
+        return {
+            'total_whiff_ratings': 0,
+            'average_whiff_rating': 0,
+            'highest_whiff_rating': 0,
+            'lowest_whiff_rating': 0,
+            'rating_level_counts': {}
+        }
+
+    by_level = ratings.groupby('level')['rating'].agg(['count', 'sum', 'max', 'min'])
+    counts = {level: int(by_level.at[level, 'count']) for level in reversed(RATING_LEVELS) if level in by_level.index}
+
+    return {
+        'total_whiff_ratings': total,
+        'average_whiff_rating': round(float(by_level['sum'].sum()) / total, 2),
+        'highest_whiff_rating': float(by_level['max'].max()),
+        'lowest_whiff_rating': float(by_level['min'].min()),
+        'rating_level_counts': counts
+    }
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Dict, List, Any, Tuple
+
+@dataclass(slots=True, frozen=True)
+class Batter:
+    """A rated batter; matchups hold a reference to it rather than a copy"""
+    player_id: int
+    name: str
+    team: str
+    team_abbreviation: str
+    position: str
+    at_bats: int
+    strikeouts: int
+    strikeout_rate: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@dataclass(slots=True, frozen=True)
+class Pitcher:
+    """A probable starter in one game"""
+    player_id: int
+    name: str
+    team: str
+    team_abbreviation: str
+    opponent: str
+    opponent_abbreviation: str
+    game_time: str
+    batters_faced: int
+    strikeouts: int
+    strikeout_rate: float
+    is_home: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@dataclass(slots=True, frozen=True)
+class Matchup:
+    """A rated pitcher/batter pair, referencing both player records"""
+    pitcher: Pitcher
+    batter: Batter
+    game_info: str
+    whiff_watch_rating: float
+    rating_level: str
+
+    @property
+    def matchup_id(self) -> str:
+        return f"{self.pitcher.player_id}_{self.batter.player_id}"
+
+class PayloadEncoder:
+    """Builds payload dicts from records, one dict per player record however many matchups share it"""
+
+    def __init__(self):
+        self._players = {}
+
+    def player(self, record) -> Dict[str, Any]:
+        # Keyed by identity: records are immutable and stay alive while referenced here
+        entry = self._players.get(id(record))
+        if entry is None:
+            entry = self._players[id(record)] = (record, record.to_dict())
+        return entry[1]
+
+    def matchup(self, matchup: Matchup) -> Dict[str, Any]:
+        return {
+            'matchup_id': matchup.matchup_id,
+            'game_info': matchup.game_info,
+            'pitcher': self.player(matchup.pitcher),
+            'batter': self.player(matchup.batter),
+            'whiff_watch_rating': matchup.whiff_watch_rating,
+            'rating_level': matchup.rating_level
+        }
+
+def payload_lists(batters: List[Batter], pitchers: List[Pitcher],
+                  matchups: List[Matchup]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """(active_batters, probable_pitchers, whiff_watch_ratings) as they appear in a payload"""
+    encoder = PayloadEncoder()
+    return (
+        [encoder.player(batter) for batter in batters],
+        [encoder.player(pitcher) for pitcher in pitchers],
+        [encoder.matchup(matchup) for matchup in matchups]
+    )
+
+def matchup_dicts(matchups: List[Matchup]) -> List[Dict[str, Any]]:
+    """Matchup dicts for a partial result, such as one streamed game"""
+    encoder = PayloadEncoder()
+    return [encoder.matchup(matchup) for matchup in matchups]
@@ -0,0 +1,167 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+DEFAULT_RESULT_TTL = 300  # seconds
+ERROR_RESULT_TTL = 30  # seconds; failed generations are retried sooner
+
+class ResultCache:
+    """In-process cache of generated payloads with stale-while-revalidate refreshes
+
+    Fresh entries are served directly. Stale entries are still served right away
+    while a single background worker regenerates them. A per-key lock makes sure
+    only one caller regenerates a missing entry; concurrent callers wait for it.
+    Whenever a payload is stored, entries whose key fails retain(key) (e.g. an
+    earlier day's) are dropped along with their idle locks.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_RESULT_TTL, error_ttl: float = ERROR_RESULT_TTL,
+                 retain: Optional[Callable[[str], bool]] = None):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.retain = retain
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._key_locks = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='result-cache-refresh')
+
+    def get(self, key: str, producer: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the payload for key, annotated with cache metadata"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_stale(entry):
+                    self.hits += 1
+                    return self._annotate(key, entry, 'hit')
+
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._worker.submit(self._background_refresh, key, producer)
+                return self._annotate(key, entry, 'stale')
+
+            self.misses += 1
+
+        with self._key_lock(key):
+            # Another caller may have populated the entry while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._store(key, producer())
+            return self._annotate(key, entry, 'miss')
+
+    def refresh(self, key: str, producer: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Regenerate the payload for key synchronously and return it"""
+        with self._key_lock(key):
+            entry = self._store(key, producer())
+        return self._annotate(key, entry, 'refresh')
+
+    def peek(self, key: str, allow_stale: bool = False, allow_error: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for key without generating it, or None (counted as a miss)
+
+        Only fresh, successful payloads are returned unless allow_stale / allow_error are set.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry['error'] and not allow_error):
+                self.misses += 1
+                return None
+            if self._is_stale(entry):
+                if not allow_stale:
+                    self.misses += 1
+                    return None
+                self.stale_hits += 1
+                return self._annotate(key, entry, 'stale')
+            self.hits += 1
+            return self._annotate(key, entry, 'hit')
+
+    def put(self, key: str, data: Dict[str, Any]):
+        """Publish an already generated payload for key"""
+        self._store(key, data)
+
+    def current(self, key: str, status: str) -> Optional[Dict[str, Any]]:
+        """The payload stored for key annotated with the given cache status, without counting a lookup
+
+        After a put() this is what get() or refresh() would have returned, so a failed
+        generation still yields the last good payload.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else self._annotate(key, entry, status)
+
+    def generating(self, key: str) -> threading.Lock:
+        """The lock held while the payload for key is generated
+
+        Hold it to generate outside get()/refresh() (publishing with put()), so that
+        callers missing the key wait for that run instead of starting their own.
+        """
+        return self._key_lock(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'refreshing': sorted(self._refreshing),
+                'ttl_seconds': self.ttl
+            }
+
+    def _background_refresh(self, key: str, producer: Callable[[], Dict[str, Any]]):
+        try:
+            with self._key_lock(key):
+                self._store(key, producer())
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _store(self, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {'data': data, 'created_at': time.time(), 'error': bool(data.get('error'))}
+        with self._lock:
+            previous = self._entries.get(key)
+            # Keep serving the last good payload rather than replacing it with an error
+            if entry['error'] and previous is not None and not previous['error']:
+                previous['created_at'] = time.time() - self.ttl + self.error_ttl
+                return previous
+            self._entries[key] = entry
+            if self.retain is not None:
+                self._drop_unretained()
+        return entry
+
+    def _drop_unretained(self):
+        for key in [key for key in self._entries if not self.retain(key)]:
+            del self._entries[key]
+        # A lock still held belongs to a generation in progress; it is dropped on a later store
+        for key in [key for key, lock in self._key_locks.items() if not self.retain(key) and not lock.locked()]:
+            del self._key_locks[key]
+
+    def _is_stale(self, entry: Dict[str, Any]) -> bool:
+        ttl = self.error_ttl if entry['error'] else self.ttl
+        return time.time() - entry['created_at'] >= ttl
+
+    def _annotate(self, key: str, entry: Dict[str, Any], status: str) -> Dict[str, Any]:
+        data = dict(entry['data'])
+        metadata = dict(data.get('metadata') or {})
+        metadata['cache'] = {
+            'status': status,
+            'key': key,
+            'age_seconds': round(time.time() - entry['created_at'], 3),
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses
+        }
+        data['metadata'] = metadata
+        return data
@@ -0,0 +1,75 @@
+import threading
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+
+Event = Tuple[str, Dict[str, Any]]
+
+class SharedStream:
+    """One streaming run whose events are delivered to every client that joins it
+
+    The run happens on its own thread and every event is kept, so a client that
+    joins late first receives what it missed and then follows live. Clients that
+    go away do not stop the run, so its result is still published.
+    """
+
+    def __init__(self, produce: Callable[[], Iterator[Event]], on_done: Optional[Callable[[], None]] = None):
+        self.produce = produce
+        self.on_done = on_done
+        self.events: List[Event] = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='shared-stream', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def __iter__(self) -> Iterator[Event]:
+        """Every event of the run from the first, waiting for new ones until it finishes"""
+        position = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: position < len(self.events) or self.done)
+                if position == len(self.events):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                event = self.events[position]
+            position += 1
+            yield event
+
+    def _run(self):
+        try:
+            for event in self.produce():
+                with self._condition:
+                    self.events.append(event)
+                    self._condition.notify_all()
+        except Exception as e:
+            print(f"Shared stream failed: {e}")
+            self.error = e
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+            with self._condition:
+                self.done = True
+                self._condition.notify_all()
+
+class SharedStreams:
+    """The in-flight SharedStream of each key; a finished run is dropped, so the next join starts anew"""
+
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str, produce: Callable[[], Iterator[Event]]) -> SharedStream:
+        """The run in flight for key, or a new run of produce() if there is none"""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = SharedStream(produce, lambda: self._discard(key, stream))
+                stream.start()
+            return stream
+
+    def _discard(self, key: str, stream: SharedStream):
+        with self._lock:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+DEFAULT_STATS_CACHE_PATH = os.environ.get('WHIFF_STATS_CACHE', os.path.join('cache', 'player_stats.sqlite3'))
+DEFAULT_MAX_AGE_HOURS = 12
+DEFAULT_MAX_ENTRIES = 5000
+
+class StatsCache:
+    """Persistent player season-stats cache backed by SQLite
+
+    Entries are keyed by (player_id, group, season). An entry is fresh while it
+    is younger than max_age_hours and was fetched after any per-player cutoff
+    the caller supplies (e.g. the start of a game that has since gone final).
+    The table is capped at max_entries with least-recently-used eviction, and
+    an in-memory copy is warmed from disk on open so restarts start hot.
+
+    A small name -> player id index is kept alongside for name-based lookups.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATS_CACHE_PATH, max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_age = max_age_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._names = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS player_stats (
+                player_id INTEGER NOT NULL,
+                stat_group TEXT NOT NULL,
+                season TEXT NOT NULL,
+                stat_json TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (player_id, stat_group, season)
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS player_names (
+                name TEXT PRIMARY KEY,
+                player_id INTEGER NOT NULL
+            )
+        ''')
+        self._conn.commit()
+        self._warm()
+
+    def get_many(self, player_ids: Iterable[int], group: str, season: Any,
+                 fresh_after: Optional[Dict[int, float]] = None,
+                 max_age: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+        """Return fresh cached stats for the given players, keyed by player id
+
+        max_age (seconds) overrides the cache-wide limit for this lookup.
+        """
+        now = time.time()
+        max_age = self.max_age if max_age is None else max_age
+        fresh_after = fresh_after or {}
+        found = {}
+        touched = []
+
+        with self._lock:
+            for player_id in player_ids:
+                key = (player_id, group, str(season))
+                entry = self._memory.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+
+                stats, fetched_at = entry
+                if now - fetched_at >= max_age or fetched_at < fresh_after.get(player_id, 0):
+                    self.misses += 1
+                    continue
+
+                self._memory.move_to_end(key)
+                found[player_id] = stats
+                touched.append((now, *key))
+                self.hits += 1
+
+            if touched:
+                self._execute_many(
+                    'UPDATE player_stats SET last_access = ? WHERE player_id = ? AND stat_group = ? AND season = ?',
+                    touched
+                )
+        return found
+
+    def put_many(self, stats_by_player: Dict[int, Dict[str, Any]], group: str, season: Any):
+        """Store freshly fetched stats, evicting the least recently used entries over the cap"""
+        if not stats_by_player:
+            return
+
+        now = time.time()
+        rows = []
+        with self._lock:
+            for player_id, stats in stats_by_player.items():
+                key = (player_id, group, str(season))
+                self._memory[key] = (stats, now)
+                self._memory.move_to_end(key)
+                rows.append((*key, json.dumps(stats), now, now))
+
+            self._execute_many(
+                'INSERT OR REPLACE INTO player_stats '
+                '(player_id, stat_group, season, stat_json, fetched_at, last_access) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+            evicted = []
+            while len(self._memory) > self.max_entries:
+                key, _ = self._memory.popitem(last=False)
+                evicted.append(key)
+            if evicted:
+                self._execute_many(
+                    'DELETE FROM player_stats WHERE player_id = ? AND stat_group = ? AND season = ?', evicted
+                )
+
+    def get_player_id(self, name: str) -> Optional[int]:
+        """Look up a player id in the local name index"""
+        with self._lock:
+            return self._names.get(name.lower())
+
+    def put_player_ids(self, ids_by_name: Dict[str, int]):
+        """Record name -> player id pairs in the local name index"""
+        with self._lock:
+            rows = [(name.lower(), player_id) for name, player_id in ids_by_name.items()
+                    if name and player_id and self._names.get(name.lower()) != player_id]
+            if not rows:
+                return
+            self._names.update(rows)
+            self._execute_many('INSERT OR REPLACE INTO player_names (name, player_id) VALUES (?, ?)', rows)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._names.clear()
+            self._execute_many('DELETE FROM player_stats', [()])
+            self._execute_many('DELETE FROM player_names', [()])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._memory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0
+            }
+
+    def _warm(self):
+        """Load the most recently used entries from disk into memory"""
+        rows = self._conn.execute(
+            'SELECT player_id, stat_group, season, stat_json, fetched_at FROM player_stats '
+            'ORDER BY last_access DESC LIMIT ?', (self.max_entries,)
+        ).fetchall()
+        for player_id, group, season, stat_json, fetched_at in reversed(rows):
+            self._memory[(player_id, group, season)] = (json.loads(stat_json), fetched_at)
+        self._names = dict(self._conn.execute('SELECT name, player_id FROM player_names').fetchall())
+
+    def _execute_many(self, sql: str, rows: list):
+        try:
+            self._conn.executemany(sql, rows)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Stats cache write failed: {e}")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_stats_cache() -> Optional[StatsCache]:
+    """Return the process-wide stats cache, or None if it cannot be opened"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = StatsCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"Stats cache unavailable, continuing without it: {e}")
+                return None
+        return _default_cache
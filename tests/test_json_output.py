@@ -0,0 +1,29 @@
+import json
+import os
+import stat
+import threading
+
+import json_output
+
+def test_concurrent_publishes_leave_complete_files(tmp_path):
+    payloads = [{'generated_at': str(n), 'whiff_watch_ratings': [], 'filler': 'x' * 100000} for n in range(8)]
+    errors = []
+
+    def publish(data):
+        try:
+            json_output.publish_static(data, str(tmp_path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publish, args=(data,)) for data in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    published = json.loads((tmp_path / json_output.DATA_FILE).read_text())
+    assert published in payloads
+    assert json.loads((tmp_path / json_output.COMPACT_DATA_FILE).read_text())['generated_at'] == published['generated_at']
+    assert stat.S_IMODE(os.stat(tmp_path / json_output.DATA_FILE).st_mode) == 0o644
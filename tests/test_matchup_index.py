@@ -0,0 +1,26 @@
+from matchup_index import MatchupIndex
+
+def matchup(pitcher_id: int, batter_id: int, game_time: str, rating: float) -> dict:
+    return {
+        'matchup_id': f"{pitcher_id}_{batter_id}",
+        'pitcher': {'team_abbreviation': '1', 'game_time': game_time},
+        'batter': {'team_abbreviation': '2'},
+        'whiff_watch_rating': rating,
+        'rating_level': 'MODERATE'
+    }
+
+def test_pages_keep_a_pitchers_doubleheader_matchups_apart():
+    # The same pitcher and batter in both games of a doubleheader share a matchup id and rating
+    matchups = [matchup(10, 20, '2025-06-29T17:05:00Z', 45.0), matchup(10, 20, '2025-06-29T23:05:00Z', 45.0),
+                matchup(10, 21, '2025-06-29T17:05:00Z', 40.0)]
+    index = MatchupIndex(matchups)
+
+    seen = []
+    cursor = None
+    while True:
+        page = index.query(limit=1, cursor=cursor)
+        seen += [(m['matchup_id'], m['pitcher']['game_time']) for m in page['matchups']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted((m['matchup_id'], m['pitcher']['game_time']) for m in matchups)
@@ -0,0 +1,22 @@
+from datetime import datetime, time
+
+from prewarm import PrewarmScheduler
+
+def scheduler(**kwargs) -> PrewarmScheduler:
+    return PrewarmScheduler(lambda: {}, **{'daily_times': [], 'before_first_pitch': 0, **kwargs})
+
+def test_first_run_is_at_startup():
+    assert scheduler().next_run()[1] == 'startup'
+
+def test_runs_when_the_date_rolls_over():
+    prewarm = scheduler(daily_times=[time(4, 30)])
+    prewarm._anchor = prewarm._last_finished = datetime(2025, 6, 29, 23, 15)
+    assert prewarm.next_run() == (datetime(2025, 6, 30, 0, 0), 'date rollover')
+
+def test_earlier_runs_come_before_the_rollover():
+    prewarm = scheduler(daily_times=[time(4, 30)], interval=600)
+    prewarm._anchor = prewarm._last_finished = datetime(2025, 6, 29, 23, 15)
+    assert prewarm.next_run() == (datetime(2025, 6, 29, 23, 25), 'interval')
+
+    prewarm._anchor = prewarm._last_finished = datetime(2025, 6, 30, 0, 0, 1)
+    assert prewarm.next_run() == (datetime(2025, 6, 30, 0, 10, 1), 'interval')
@@ -0,0 +1,25 @@
+from matchup_index import MatchupIndexCache
+from result_cache import ResultCache
+
+def test_unretained_keys_are_dropped_when_a_payload_is_stored():
+    current = {'day': '2025-06-29'}
+    cache = ResultCache(retain=lambda key: key.startswith(current['day']))
+    cache.get('2025-06-29:default', lambda: {'n': 1})
+    cache.get('2025-06-29:full', lambda: {'n': 2})
+
+    current['day'] = '2025-06-30'
+    cache.get('2025-06-30:default', lambda: {'n': 3})
+
+    assert cache.stats()['entries'] == 1
+    assert sorted(cache._key_locks) == ['2025-06-30:default']
+    assert cache.peek('2025-06-29:default') is None
+
+def test_index_cache_drops_unretained_keys():
+    current = {'day': '2025-06-29'}
+    indexes = MatchupIndexCache(retain=lambda key: key.startswith(current['day']))
+    indexes.get('2025-06-29:default', {'whiff_watch_ratings': []})
+
+    current['day'] = '2025-06-30'
+    indexes.get('2025-06-30:default', {'whiff_watch_ratings': []})
+
+    assert list(indexes._indexes) == ['2025-06-30:default']
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from shared_stream import SharedStreams
+
+def gated_run(gate: threading.Event, runs: list):
+    def produce():
+        runs.append(1)
+        yield 'game', {'n': 1}
+        gate.wait(5)
+        yield 'summary', {'n': 2}
+    return produce
+
+def test_clients_joining_meanwhile_share_one_run():
+    streams = SharedStreams()
+    gate = threading.Event()
+    runs = []
+
+    first = streams.join('key', gated_run(gate, runs))
+    late = streams.join('key', gated_run(gate, runs))
+    assert late is first
+
+    gate.set()
+    # The late client still receives the events emitted before it started reading
+    assert list(late) == list(first) == [('game', {'n': 1}), ('summary', {'n': 2})]
+    assert len(runs) == 1
+
+def test_finished_run_is_not_rejoined():
+    streams = SharedStreams()
+    gate = threading.Event()
+    gate.set()
+    runs = []
+
+    list(streams.join('key', gated_run(gate, runs)))
+    list(streams.join('key', gated_run(gate, runs)))
+    assert len(runs) == 2
+
+def test_run_failure_reaches_every_client():
+    def produce():
+        yield 'game', {}
+        raise RuntimeError("upstream down")
+
+    stream = SharedStreams().join('key', produce)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            list(stream)
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from upstream import CircuitBreaker, DeadlineExceeded, UpstreamClient
+
+RESET_TIMEOUT = 0.05
+
+class Response:
+    status_code = 200
+    headers = {}
+
+class Session:
+    """Stands in for requests.Session / httpx.AsyncClient, counting the requests it sees"""
+
+    def __init__(self, hang: bool = False):
+        self.hang = hang
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return Response()
+
+    async def aget(self, url, timeout=None):
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        return Response()
+
+class AsyncClient:
+    def __init__(self, session: Session):
+        self.get = session.aget
+
+def half_open_client() -> UpstreamClient:
+    """A client whose breaker has opened and whose reset timeout has passed"""
+    client = UpstreamClient(rate=float('inf'), breaker=CircuitBreaker(failure_threshold=1, reset_timeout=RESET_TIMEOUT))
+    client.breaker.record_failure()
+    time.sleep(RESET_TIMEOUT)
+    assert client.breaker.state == 'half_open'
+    return client
+
+def test_trial_rejected_by_deadline_is_not_claimed():
+    client = half_open_client()
+    session = Session()
+
+    with pytest.raises(DeadlineExceeded):
+        client.get(session, 'https://statsapi.mlb.com/api/v1/schedule', 10, deadline=time.monotonic())
+    assert session.calls == 0
+
+    assert client.get(session, 'https://statsapi.mlb.com/api/v1/schedule', 10).status_code == 200
+    assert client.breaker.state == 'closed'
+
+def test_cancelled_trial_is_released():
+    client = half_open_client()
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(client.aget(AsyncClient(Session(hang=True)), 'https://statsapi.mlb.com', 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert client.breaker.allow()
+
+def test_unexpected_error_counts_as_failed_trial():
+    client = half_open_client()
+
+    class Broken(Session):
+        def get(self, url, timeout=None):
+            raise ValueError("malformed response")
+
+    with pytest.raises(ValueError):
+        client.get(Broken(), 'https://statsapi.mlb.com', 10)
+    assert client.breaker.state == 'open'
+
+def test_abandoned_trial_expires():
+    client = half_open_client()
+    assert client.breaker.allow()
+    assert not client.breaker.allow()
+    time.sleep(RESET_TIMEOUT)
+    assert client.breaker.allow()
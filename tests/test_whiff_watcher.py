@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from records import Batter, Pitcher
+from stats_cache import StatsCache
+from upstream import DeadlineExceeded, UpstreamClient
+from whiff_watcher import ScheduleCache, WhiffWatcher
+
+LINE = {'atBats': 200, 'strikeOuts': 50}
+
+def game(game_id: int, home_id: int, away_id: int, status: str, starts_in: timedelta) -> dict:
+    start = datetime.now(timezone.utc) + starts_in
+    return {'game_id': game_id, 'home_id': home_id, 'away_id': away_id, 'status': status,
+            'game_datetime': start.strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+def test_stats_fetched_mid_game_are_not_persisted(tmp_path):
+    cache = StatsCache(path=str(tmp_path / 'stats.sqlite3'))
+    watcher = WhiffWatcher(stats_cache=cache)
+    watcher._run_schedule = [
+        game(1, 101, 102, 'In Progress', timedelta(hours=-1)),
+        game(2, 103, 104, 'Final', timedelta(hours=-4)),
+        game(3, 105, 106, 'Scheduled', timedelta(hours=3)),
+        game(4, 107, 108, 'Pre-Game', timedelta(minutes=-2))  # the pinned schedule lags behind
+    ]
+
+    player_teams = {1: 101, 2: 103, 3: 105, 4: 107}
+    watcher._store_stats({pid: LINE for pid in (1, 2, 3, 4, 5)}, 'hitting', player_teams)
+
+    # Player 5 has no known team, so it is held back while a game is in progress
+    assert sorted(cache.get_many([1, 2, 3, 4, 5], 'hitting', watcher._stats_scope)) == [2, 3]
+
+def test_stats_are_persisted_when_no_game_is_in_progress(tmp_path):
+    cache = StatsCache(path=str(tmp_path / 'stats.sqlite3'))
+    watcher = WhiffWatcher(stats_cache=cache)
+    watcher._run_schedule = [game(1, 101, 102, 'Scheduled', timedelta(hours=3))]
+
+    watcher._store_stats({1: LINE, 2: LINE}, 'hitting', {1: 101})
+
+    assert sorted(cache.get_many([1, 2], 'hitting', watcher._stats_scope)) == [1, 2]
+
+def test_doubleheader_starter_is_not_reused_for_the_other_game():
+    first, second = '2025-06-29T17:05:00Z', '2025-06-29T23:05:00Z'
+    games = [
+        {'game_id': 1, 'home_id': 1, 'away_id': 2, 'home_name': 'Home', 'away_name': 'Away', 'game_datetime': first},
+        {'game_id': 2, 'home_id': 1, 'away_id': 2, 'home_name': 'Home', 'away_name': 'Away', 'game_datetime': second}
+    ]
+    # Only game 1's home starter qualified
+    pitcher = Pitcher(10, 'Starter', 'Home', '1', 'Away', '2', first, 100, 30, 30.0, True)
+    batters = [Batter(20 + n, f"Batter {n}", 'Team 2', '2', 'CF', 200, 50, 25.0) for n in range(3)]
+
+    matchups = WhiffWatcher(use_stats_cache=False).get_todays_matchups([pitcher], batters, games)
+
+    assert len(matchups) == 3
+    assert {matchup.pitcher.game_time for matchup in matchups} == {first}
+    assert len({matchup.matchup_id for matchup in matchups}) == 3
+
+def test_concurrent_schedule_misses_share_one_fetch():
+    cache = ScheduleCache()
+    fetches = []
+    results = []
+
+    async def fetch(game_date):
+        fetches.append(game_date)
+        await asyncio.sleep(0.05)
+        return [{'game_id': 1}]
+
+    def run():
+        # Each thread runs its own event loop, like the sync wrappers and the pre-warm thread
+        results.append(asyncio.run(cache.get(date(2025, 6, 29), fetch)))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert results == [[{'game_id': 1}]] * 4
+
+def test_failed_schedule_fetch_is_retried_by_waiters():
+    cache = ScheduleCache()
+    attempts = []
+
+    async def fetch(game_date):
+        attempts.append(game_date)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ConnectionError("schedule unavailable")
+        return [{'game_id': 1}]
+
+    async def main():
+        return await asyncio.gather(cache.get(date(2025, 6, 29), fetch), cache.get(date(2025, 6, 29), fetch),
+                                    return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, ConnectionError)
+    assert second == [{'game_id': 1}]
+
+def test_deadline_rejection_is_reported_as_latency_budget():
+    watcher = WhiffWatcher(upstream=UpstreamClient(rate=float('inf')), collect_metrics=True)
+    watcher._deadline = time.monotonic()
+
+    with pytest.raises(DeadlineExceeded):
+        watcher._get('https://statsapi.mlb.com/api/v1/schedule', 'schedule')
+
+    assert watcher.budget_exceeded
+    assert 'upstream_unavailable' not in watcher._degraded
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # only needed by the async path
+    httpx = None
+
+UPSTREAM_RATE = 50.0  # requests per second, sustained
+UPSTREAM_BURST = 50
+UPSTREAM_RETRIES = 3
+BACKOFF_BASE = 0.25  # seconds
+BACKOFF_MAX = 4.0  # seconds
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures before the circuit opens
+BREAKER_RESET_TIMEOUT = 30.0  # seconds before a trial request is let through
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling StatsAPI when the circuit is open or the run's deadline has passed"""
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """Raised instead of calling StatsAPI when the run's deadline has passed; StatsAPI itself may be fine"""
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() hands out tokens and says how long to wait for them"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single trial request through once reset_timeout has passed
+
+    A trial that never reports back (abandoned or cancelled) stops blocking others after another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            if self._trial_in_flight and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_in_flight = True
+            self._trial_started = now
+            return True
+
+    def release(self):
+        """Give up a trial without an outcome, e.g. when the request was cancelled before it finished"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class UpstreamClient:
+    """Rate-limited, retrying, circuit-broken access to StatsAPI, shared by every watcher in a process
+
+    Requests wait for a token from the bucket, 429 and 5xx responses and connection
+    errors are retried with full-jitter exponential backoff (honouring Retry-After),
+    and nothing is started or retried past the caller's deadline. Once the breaker
+    opens, calls fail fast with UpstreamUnavailable so callers can fall back to
+    cached data. A response still failing after the last retry is returned as is.
+    """
+
+    def __init__(self, rate: float = UPSTREAM_RATE, burst: float = UPSTREAM_BURST, retries: int = UPSTREAM_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.retried = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def get(self, session: requests.Session, url: str, timeout: float, deadline: Optional[float] = None) -> requests.Response:
+        """GET url through a requests session"""
+        attempt = 0
+        while True:
+            wait = self._before_attempt(deadline)
+            try:
+                time.sleep(wait)
+                response = session.get(url, timeout=self._timeout(timeout, deadline))
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self._after_failure(attempt, None, deadline)
+                if delay is None:
+                    raise
+            except BaseException as e:
+                self._after_error(e)
+                raise
+            else:
+                delay = self._after_response(attempt, response, deadline)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def aget(self, client: 'httpx.AsyncClient', url: str, timeout: float,
+                   deadline: Optional[float] = None) -> 'httpx.Response':
+        """GET url through an httpx.AsyncClient"""
+        attempt = 0
+        while True:
+            wait = self._before_attempt(deadline)
+            try:
+                await asyncio.sleep(wait)
+                response = await client.get(url, timeout=self._timeout(timeout, deadline))
+            except httpx.TransportError:
+                delay = self._after_failure(attempt, None, deadline)
+                if delay is None:
+                    raise
+            except BaseException as e:
+                self._after_error(e)
+                raise
+            else:
+                delay = self._after_response(attempt, response, deadline)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'circuit_state': self.breaker.state,
+                'consecutive_failures': self.breaker.failures,
+                'retries': self.retried,
+                'rejected': self.rejected
+            }
+
+    def _before_attempt(self, deadline: Optional[float]) -> float:
+        """Take a rate-limit token and check the deadline, then the breaker; returns the seconds to wait first
+
+        The breaker goes last so a half-open trial is only claimed by a request that will be sent.
+        """
+        wait = self.bucket.reserve()
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            self._count('rejected')
+            raise DeadlineExceeded("Run deadline reached before the request could start")
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise UpstreamUnavailable("StatsAPI circuit breaker is open")
+        return wait
+
+    @staticmethod
+    def _timeout(timeout: float, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return timeout
+        return max(0.001, min(timeout, deadline - time.monotonic()))
+
+    def _after_response(self, attempt: int, response, deadline: Optional[float]) -> Optional[float]:
+        """Record the outcome; returns the backoff before retrying, or None when the response is final"""
+        if response.status_code not in RETRY_STATUSES:
+            self.breaker.record_success()
+            return None
+        return self._after_failure(attempt, response.headers.get('Retry-After'), deadline)
+
+    def _after_error(self, error: BaseException):
+        """An attempt ended in an error that is not retried: count it unless it was a cancellation"""
+        if isinstance(error, Exception):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _after_failure(self, attempt: int, retry_after: Optional[str], deadline: Optional[float]) -> Optional[float]:
+        self.breaker.record_failure()
+        if attempt >= self.retries:
+            return None
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            delay = max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            pass  # an HTTP-date Retry-After falls back to the computed backoff
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        self._count('retried')
+        return delay
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+_default_upstream = None
+_default_upstream_lock = threading.Lock()
+
+def get_default_upstream() -> UpstreamClient:
+    """Return the process-wide upstream client, so every watcher shares one rate limit and breaker"""
+    global _default_upstream
+    with _default_upstream_lock:
+        if _default_upstream is None:
+            _default_upstream = UpstreamClient()
+        return _default_upstream
@@ -1,303 +1,945 @@
 import statsapi as mlb
 import requests
+import asyncio
 import json
+import threading
+import time
 import pandas as pd
-from datetime import datetime, date
-from typing import Dict, List, Any, Optional
+import rating_engine
+from datetime import datetime, date, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, AsyncIterator, Awaitable, Tuple
+from requests.adapters import HTTPAdapter
+from stats_cache import StatsCache, get_default_stats_cache
+from metrics import Metrics, NullMetrics
+from upstream import UpstreamClient, UpstreamUnavailable, DeadlineExceeded, RETRY_STATUSES, get_default_upstream
+from records import Batter, Pitcher, Matchup, payload_lists, matchup_dicts
+
+REQUEST_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+REQUEST_TIMEOUT = 10
+DEFAULT_MAX_WORKERS = 8
+STATS_BATCH_SIZE = 50
+SESSION_POOL_SIZE = 32
+SCHEDULE_CACHE_TTL = 300  # seconds
+DEFAULT_MAX_TEAMS = 10
+DEFAULT_BATTERS_PER_TEAM = 3
+DEFAULT_LATENCY_BUDGET = 60  # seconds; bounds every run even when StatsAPI is slow
+FULL_SLATE_LATENCY_BUDGET = 90  # seconds; never below the default, since a full slate does more lookups
+INCREMENTAL_MAX_AGE = 3 * 3600  # seconds before an incremental run rebuilds from scratch
+STAT_FIELDS = ('atBats', 'strikeOuts', 'battersFaced')  # the parts of a stat line the ratings use
+FINAL_STATUSES = ('Final', 'Game Over', 'Completed Early')
+UNPLAYED_STATUSES = ('Postponed', 'Cancelled')
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def get_shared_session() -> requests.Session:
+    """Return the process-wide HTTP session so connections are reused across runs"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            session.headers.update(REQUEST_HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SESSION_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _shared_session = session
+        return _shared_session
+
+class ScheduleCache:
+    """Thread-safe cache of daily schedules keyed by date, with a time-to-live"""
+    
+    def __init__(self, ttl: float = SCHEDULE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+    
+    async def get(self, game_date: date, fetch: Callable[[date], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Return the cached schedule for game_date, fetching it when missing or stale
+        
+        Concurrent misses share one fetch, whichever thread or event loop they run on.
+        If that fetch fails, the callers waiting on it try again themselves.
+        """
+        key = game_date.isoformat()
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry[0] < self.ttl:
+                    return entry[1]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = Future()
+                    break
+            # Shielded so a waiter being cancelled does not cancel the fetch for everyone else
+            games = await asyncio.shield(asyncio.wrap_future(pending))
+            if games is not None:
+                return games
+        
+        games = None
+        try:
+            games = await fetch(game_date)
+            with self._lock:
+                # Drop other days so the cache does not grow as the date rolls over
+                self._entries = {key: (time.monotonic(), games)}
+            return games
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set_result(games)
+    
+    def lookup(self, game_date: date) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached schedule for game_date if it is still fresh, without fetching"""
+        with self._lock:
+            entry = self._entries.get(game_date.isoformat())
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            return None
+    
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+_shared_schedule_cache = ScheduleCache()
+
+# Name -> player id index used when no persistent stats cache is available
+_player_name_index = {}
 
 class WhiffWatcher:
-    """Main class for generating MLB whiff watch ratings using Baseball Savant data"""
+    """Main class for generating MLB whiff watch ratings using Baseball Savant data
+    
+    The pipeline is written once, as coroutines (agenerate_whiff_watch_data() and the
+    a-prefixed fetch stages), with at most max_workers requests in flight per run.
+    The synchronous methods are thin wrappers that run them on a fresh event loop,
+    so they must not be called from inside a running loop. Requests go through the
+    pooled requests session on worker threads; AsyncWhiffWatcher swaps in httpx.
+    """
     
-    def __init__(self):
-        self.current_season = 2025
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, session: Optional[requests.Session] = None,
+                 schedule_cache: Optional[ScheduleCache] = None, stats_cache: Optional[StatsCache] = None,
+                 use_stats_cache: bool = True, full_slate: bool = False,
+                 max_teams: Optional[int] = DEFAULT_MAX_TEAMS, batters_per_team: Optional[int] = DEFAULT_BATTERS_PER_TEAM,
+                 latency_budget: Optional[float] = None, collect_metrics: bool = True, incremental: bool = False,
+                 game_date: Optional[date] = None, season: Optional[int] = None,
+                 upstream: Optional[UpstreamClient] = None):
+        """
+        In full-slate mode every team playing and every non-pitcher on its active roster
+        is rated, within latency_budget seconds (FULL_SLATE_LATENCY_BUDGET by default).
+        Otherwise max_teams and batters_per_team cap the slate; None means no cap.
+        Other runs get DEFAULT_LATENCY_BUDGET; pass latency_budget=0 for no deadline.
+        Upstream calls go through the shared rate-limited, retrying upstream client;
+        when it gives up, the last cached stats are served and the run is flagged degraded.
+        With collect_metrics=False instrumentation is replaced by a no-op recorder.
+        With incremental=True repeated runs on the same instance only refetch players
+        whose games changed status and probable starters that changed since the last run.
+        game_date pins the slate to a fixed (e.g. historical) date instead of today; past
+        dates use stats accumulated up to the day before, so ratings can be backtested.
+        """
+        self.game_date = game_date
+        self.current_season = season or (game_date.year if game_date else 2025)
         self.min_at_bats = 150
+        self.max_workers = max(1, max_workers)
+        self.session = session or get_shared_session()
+        self.schedule_cache = schedule_cache or _shared_schedule_cache
+        self.stats_cache = (stats_cache or get_default_stats_cache()) if use_stats_cache else None
+        self.full_slate = full_slate
+        self.max_teams = None if full_slate else max_teams
+        self.batters_per_team = None if full_slate else batters_per_team
+        if latency_budget is None:
+            latency_budget = FULL_SLATE_LATENCY_BUDGET if full_slate else DEFAULT_LATENCY_BUDGET
+        self.latency_budget = latency_budget
+        self.upstream = upstream or get_default_upstream()
+        self.collect_metrics = collect_metrics
+        self.metrics = Metrics() if collect_metrics else NullMetrics()
+        self.incremental = incremental
+        self._incremental_state = None
+        self._dirty_teams = None
+        self._changed_games = []
+        self._rosters_memo = None
+        self._stats_memo = None
+        self._run_schedule = None
+        self._deadline = None
+        self.budget_exceeded = False
+        self._degraded = set()
+        self._stale_stats_served = 0
+        self._semaphore = None
         
-    def fetch_current_batters(self) -> List[Dict[str, Any]]:
-        """Fetch real 2025 batter data from MLB StatsAPI"""
+    def _run(self, coroutine: Awaitable) -> Any:
+        """Drive one of the pipeline's coroutines from synchronous code"""
+        loop, executor = self._new_loop()
         try:
-            print("Fetching real 2025 batter data from MLB StatsAPI...")
-            
-            # Get teams playing today for focused data retrieval
-            today_games = mlb.schedule(date=date.today().strftime('%m/%d/%Y'))
-            team_ids = set()
+            return loop.run_until_complete(coroutine)
+        finally:
+            self._close_loop(loop, executor)
+    
+    def _new_loop(self) -> Tuple[asyncio.AbstractEventLoop, ThreadPoolExecutor]:
+        """A private event loop with enough worker threads for max_workers blocking requests"""
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='whiff-watcher')
+        loop.set_default_executor(executor)
+        return loop, executor
+    
+    @staticmethod
+    def _close_loop(loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor):
+        tasks = asyncio.all_tasks(loop)
+        if tasks:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.wait(tasks))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        # Requests abandoned at the latency budget finish on their own; the run does not wait for them
+        executor.shutdown(wait=False, cancel_futures=True)
+        loop.close()
+    
+    def _limiter(self) -> asyncio.Semaphore:
+        """The running loop's cap of max_workers requests in flight"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.max_workers))
+        return self._semaphore[1]
+    
+    async def _aget(self, url: str, endpoint: str) -> requests.Response:
+        """Issue a GET without blocking the event loop; the session call runs on a worker thread"""
+        async with self._limiter():
+            return await asyncio.to_thread(self._get, url, endpoint)
+    
+    async def _gather(self, awaitables: Iterable[Awaitable], default: Any = None) -> List[Any]:
+        """Await everything concurrently, returning results in input order
+        
+        Anything still pending when the run's latency budget runs out gets default instead.
+        """
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        if not tasks:
+            return []
+        
+        timeout = None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            self.budget_exceeded = True
+            print(f"Latency budget exhausted, dropping {len(pending)} pending lookups")
+            for task in pending:
+                task.cancel()
+        return [default if task in pending else task.result() for task in tasks]
+    
+    @staticmethod
+    async def _resolved(value: Any) -> Any:
+        return value
+    
+    def _get(self, url: str, endpoint: str) -> requests.Response:
+        """Issue a GET against the upstream API through the pooled session, recording it under endpoint"""
+        started = time.perf_counter()
+        try:
+            response = self.upstream.get(self.session, url, REQUEST_TIMEOUT, self._deadline)
+        except Exception as e:
+            self._record_upstream_failure(endpoint, time.perf_counter() - started, e)
+            raise
+        self._record_upstream_response(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+    
+    def _record_upstream_failure(self, endpoint: str, seconds: float, error: Exception):
+        """Note a call that raised; the run is degraded from here on"""
+        if isinstance(error, DeadlineExceeded):
+            # Out of time, not a StatsAPI outage: reported as latency_budget
+            self.metrics.record_error('latency_budget')
+            self.budget_exceeded = True
+        elif isinstance(error, UpstreamUnavailable):
+            self.metrics.record_error('upstream_unavailable')
+            self._degraded.add('upstream_unavailable')
+        else:
+            self.metrics.record_request(endpoint, seconds, ok=False)
+            self._degraded.add('upstream_errors')
+    
+    def _record_upstream_response(self, endpoint: str, seconds: float, status_code: int):
+        self.metrics.record_request(endpoint, seconds, ok=status_code < 400)
+        if status_code in RETRY_STATUSES:
+            # Still throttled or failing after the upstream client's retries
+            self._degraded.add('upstream_errors')
+    
+    @property
+    def slate_date(self) -> date:
+        """The date being rated: the pinned game_date, or today"""
+        return self.game_date or date.today()
+    
+    @property
+    def stats_as_of(self) -> Optional[date]:
+        """Last day of stats to use for a historical slate, or None for live season stats"""
+        if self.game_date and self.game_date < date.today():
+            return self.game_date - timedelta(days=1)
+        return None
+    
+    @property
+    def _stats_scope(self) -> str:
+        """Stats cache key for the season (and cutoff date, for historical slates)"""
+        as_of = self.stats_as_of
+        return f"{self.current_season}:{as_of.isoformat()}" if as_of else str(self.current_season)
+    
+    def get_todays_schedule(self) -> List[Dict[str, Any]]:
+        """Get today's schedule, shared by every stage of a generation run"""
+        if self._run_schedule is None:
+            self._run(self.aget_todays_schedule())
+        return self._run_schedule
+    
+    async def aget_todays_schedule(self) -> List[Dict[str, Any]]:
+        """Get today's schedule through the shared schedule cache, pinned for the run"""
+        if self._run_schedule is None:
+            fetched = []
             
-            for game in today_games:
-                team_ids.add(game.get('home_id'))
-                team_ids.add(game.get('away_id'))
+            async def fetch(game_date: date) -> List[Dict[str, Any]]:
+                fetched.append(game_date)
+                return await self.afetch_schedule(game_date)
             
-            batters = []
+            self._run_schedule = await self.schedule_cache.get(self.slate_date, fetch)
+            self.metrics.record_cache('schedule', hits=0 if fetched else 1, misses=1 if fetched else 0)
+        return self._run_schedule
+    
+    def _slate_games(self) -> List[Dict[str, Any]]:
+        """The run's pinned schedule, or no games if it could not be fetched"""
+        return self._run_schedule or []
+    
+    def fetch_schedule(self, game_date: date) -> List[Dict[str, Any]]:
+        return self._run(self.afetch_schedule(game_date))
+    
+    async def afetch_schedule(self, game_date: date) -> List[Dict[str, Any]]:
+        """Fetch the schedule for a date with probable pitchers hydrated
+        
+        Games use the same keys as statsapi.schedule(), plus home_probable_pitcher_id
+        and away_probable_pitcher_id so starters never need a name lookup.
+        """
+        response = await self._aget(self._schedule_url(game_date), 'schedule')
+        response.raise_for_status()
+        return self._parse_schedule(response.json())
+    
+    @staticmethod
+    def _schedule_url(game_date: date) -> str:
+        return f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={game_date.isoformat()}&hydrate=probablePitcher"
+    
+    @staticmethod
+    def _parse_schedule(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Normalize a hydrated schedule response into statsapi.schedule()-style games"""
+        games = []
+        for schedule_date in data.get('dates', []):
+            for game in schedule_date.get('games', []):
+                home = game.get('teams', {}).get('home', {})
+                away = game.get('teams', {}).get('away', {})
+                home_pitcher = home.get('probablePitcher', {})
+                away_pitcher = away.get('probablePitcher', {})
+                
+                games.append({
+                    'game_id': game.get('gamePk'),
+                    'game_datetime': game.get('gameDate', ''),
+                    'game_date': schedule_date.get('date', ''),
+                    'status': game.get('status', {}).get('detailedState', ''),
+                    'home_name': home.get('team', {}).get('name', '???'),
+                    'away_name': away.get('team', {}).get('name', '???'),
+                    'home_id': home.get('team', {}).get('id'),
+                    'away_id': away.get('team', {}).get('id'),
+                    'home_probable_pitcher': home_pitcher.get('fullName', ''),
+                    'away_probable_pitcher': away_pitcher.get('fullName', ''),
+                    'home_probable_pitcher_id': home_pitcher.get('id'),
+                    'away_probable_pitcher_id': away_pitcher.get('id')
+                })
+        return games
+    
+    def fetch_current_batters(self) -> List[Batter]:
+        return self._run(self.afetch_current_batters())
+    
+    async def afetch_current_batters(self) -> List[Batter]:
+        """Fetch real 2025 batter data from MLB StatsAPI"""
+        try:
+            print("Fetching real 2025 batter data from MLB StatsAPI...")
             
             # Get batters from teams playing today - this ensures current active players
-            batters = self.get_batters_from_todays_teams(team_ids)
+            await self.aget_todays_schedule()
+            batters = await self.aget_batters_from_todays_teams(self._todays_team_ids())
             
-            if len(batters) < 20:  # If we don't have enough, get more from league leaders
+            # Leaders are full-season totals, so a historical slate would see later results
+            if len(batters) < 20 and not self.stats_as_of:  # If we don't have enough, get more from league leaders
                 try:
-                    # Use MLB StatsAPI endpoint for season hitting leaders
-                    url = f"https://statsapi.mlb.com/api/v1/stats/leaders?leaderCategories=strikeOuts&season={self.current_season}&statGroup=hitting&limit=100"
-                    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                    
-                    response = requests.get(url, headers=headers, timeout=10)
+                    response = await self._aget(self._leaders_url(), 'leaders')
                     
                     if response.status_code == 200:
-                        data = response.json()
-                        
-                        if 'leaderCategories' in data and data['leaderCategories']:
-                            leaders = data['leaderCategories'][0].get('leaders', [])
-                            existing_ids = {b['player_id'] for b in batters}
-                            
-                            for player in leaders:
-                                if len(batters) >= 50:  # Limit to 50 batters
-                                    break
-                                    
-                                person = player.get('person', {})
-                                player_id = person.get('id')
-                                
-                                if player_id and player_id not in existing_ids:
-                                    player_stats = self.get_player_season_stats(player_id, 'hitting')
-                                    
-                                    if player_stats:
-                                        at_bats = player_stats.get('atBats', 0)
-                                        strikeouts = player_stats.get('strikeOuts', 0)
-                                        
-                                        if at_bats >= 100:  # Lower threshold for league leaders
-                                            strikeout_rate = round((strikeouts / at_bats) * 100, 2) if at_bats > 0 else 0
-                                            
-                                            batters.append({
-                                                'player_id': player_id,
-                                                'name': person.get('fullName', 'Unknown'),
-                                                'team': 'Various',  # Will be updated with actual team info
-                                                'team_abbreviation': 'MLB',
-                                                'position': 'N/A',
-                                                'at_bats': at_bats,
-                                                'strikeouts': strikeouts,
-                                                'strikeout_rate': strikeout_rate
-                                            })
-                                            existing_ids.add(player_id)
+                        candidates = self._leader_candidates(response.json(), batters)
+                        stats_by_player = await self.aget_players_season_stats((p['id'] for p in candidates), 'hitting')
+                        self._add_leader_batters(batters, candidates, stats_by_player)
                     
                 except Exception as e:
                     print(f"Error with leaders API: {e}")
+                    self.metrics.record_error('leaders')
             
             print(f"Found {len(batters)} batters with real 2025 MLB data")
             return batters
             
         except Exception as e:
             print(f"Error fetching batter data: {e}")
+            self.metrics.record_error('batters')
             return []
     
+    def _todays_team_ids(self) -> set:
+        """Ids of every team playing on the slate"""
+        # Get teams playing today for focused data retrieval
+        team_ids = set()
+        for game in self._slate_games():
+            team_ids.add(game.get('home_id'))
+            team_ids.add(game.get('away_id'))
+        return team_ids
+    
+    def _leaders_url(self) -> str:
+        # Use MLB StatsAPI endpoint for season hitting leaders
+        return f"https://statsapi.mlb.com/api/v1/stats/leaders?leaderCategories=strikeOuts&season={self.current_season}&statGroup=hitting&limit=100"
+    
+    @staticmethod
+    def _leader_candidates(data: Dict[str, Any], batters: List[Batter]) -> List[Dict[str, Any]]:
+        """Strikeout leaders not already among the batters"""
+        candidates = []
+        if 'leaderCategories' in data and data['leaderCategories']:
+            leaders = data['leaderCategories'][0].get('leaders', [])
+            existing_ids = {b.player_id for b in batters}
+            
+            for player in leaders:
+                person = player.get('person', {})
+                player_id = person.get('id')
+                
+                if player_id and player_id not in existing_ids:
+                    candidates.append(person)
+                    existing_ids.add(player_id)
+        return candidates
+    
+    @staticmethod
+    def _add_leader_batters(batters: List[Batter], candidates: List[Dict[str, Any]],
+                            stats_by_player: Dict[int, Dict[str, Any]]):
+        """Top up the batters with league leaders that have enough at-bats"""
+        for person in candidates:
+            if len(batters) >= 50:  # Limit to 50 batters
+                break
+            
+            player_stats = stats_by_player.get(person['id'])
+            if player_stats:
+                at_bats = player_stats.get('atBats', 0)
+                strikeouts = player_stats.get('strikeOuts', 0)
+                
+                if at_bats >= 100:  # Lower threshold for league leaders
+                    strikeout_rate = round((strikeouts / at_bats) * 100, 2) if at_bats > 0 else 0
+                    
+                    batters.append(Batter(
+                        player_id=person['id'],
+                        name=person.get('fullName', 'Unknown'),
+                        team='Various',  # Will be updated with actual team info
+                        team_abbreviation='MLB',
+                        position='N/A',
+                        at_bats=at_bats,
+                        strikeouts=strikeouts,
+                        strikeout_rate=strikeout_rate
+                    ))
+    
     def get_player_season_stats(self, player_id: int, stat_type: str) -> Dict[str, Any]:
         """Get season stats for a specific player"""
+        return self.get_players_season_stats([player_id], stat_type).get(player_id, {})
+    
+    def get_players_season_stats(self, player_ids: Iterable[int], stat_type: str,
+                                 player_teams: Optional[Dict[int, Any]] = None) -> Dict[int, Dict[str, Any]]:
+        return self._run(self.aget_players_season_stats(player_ids, stat_type, player_teams))
+    
+    async def aget_players_season_stats(self, player_ids: Iterable[int], stat_type: str,
+                                        player_teams: Optional[Dict[int, Any]] = None) -> Dict[int, Dict[str, Any]]:
+        """Get season stats for many players using batched, hydrated people lookups
+        
+        Fresh entries come from the persistent stats cache; the rest are split into
+        chunks of STATS_BATCH_SIZE and fetched concurrently. Passing player_teams
+        (player id -> team id) lets entries for players whose game has gone final
+        since they were cached be refetched, and lets stats fetched while a player's
+        game is still in progress be kept out of the cache. Players without stats
+        (or in a failed chunk) are omitted.
+        
+        During an incremental run, stats from the previous run are reused unless the
+        player's team is one whose game changed since then; those are always refetched.
+        """
+        # The stats cache is SQLite, so its reads and writes run on worker threads
+        stats_by_player, unique_ids = await asyncio.to_thread(self._known_stats, list(player_ids), stat_type, player_teams)
+        
+        chunks = [unique_ids[i:i + STATS_BATCH_SIZE] for i in range(0, len(unique_ids), STATS_BATCH_SIZE)]
+        failed_ids = []
+        for chunk, chunk_stats in zip(chunks, await self._gather(self._afetch_stats_chunk(chunk, stat_type) for chunk in chunks)):
+            if chunk_stats is None:
+                failed_ids += chunk
+                continue
+            stats_by_player.update(chunk_stats)
+            await asyncio.to_thread(self._store_stats, chunk_stats, stat_type, player_teams)
+        
+        if failed_ids:
+            stats_by_player.update(await asyncio.to_thread(self._stale_stats, failed_ids, stat_type))
+        return stats_by_player
+    
+    def _known_stats(self, player_ids: Iterable[int], stat_type: str,
+                     player_teams: Optional[Dict[int, Any]] = None) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """Stats available without a request (previous run, stats cache), and the ids still to fetch"""
+        unique_ids = list(dict.fromkeys(pid for pid in player_ids if pid))
+        player_teams = player_teams or {}
+        
+        stats_by_player = {}
+        refresh_ids = set()
+        if self._dirty_teams is not None:
+            for pid in unique_ids:
+                if str(player_teams.get(pid)) in self._dirty_teams:
+                    refresh_ids.add(pid)
+                elif (stat_type, pid) in self._stats_memo:
+                    stats_by_player[pid] = self._stats_memo[(stat_type, pid)]
+            self.metrics.record_cache('previous_run', hits=len(stats_by_player), misses=len(unique_ids) - len(stats_by_player))
+            unique_ids = [pid for pid in unique_ids if pid not in stats_by_player]
+        
+        if self.stats_cache:
+            # Historical stat lines never change, so they never expire
+            cached = self.stats_cache.get_many(
+                [pid for pid in unique_ids if pid not in refresh_ids], stat_type, self._stats_scope,
+                self._stats_fresh_after(player_teams), max_age=float('inf') if self.stats_as_of else None
+            )
+            self.metrics.record_cache('stats', hits=len(cached), misses=len(unique_ids) - len(cached))
+            stats_by_player.update(cached)
+            self._remember_stats(cached, stat_type)
+            unique_ids = [pid for pid in unique_ids if pid not in cached]
+        return stats_by_player, unique_ids
+    
+    def _stale_stats(self, player_ids: List[int], stat_type: str) -> Dict[int, Dict[str, Any]]:
+        """The last cached stats, however old, for players whose fetch failed"""
+        stale = self.stats_cache.get_many(player_ids, stat_type, self._stats_scope, max_age=float('inf')) if self.stats_cache else {}
+        self._stale_stats_served += len(stale)
+        self._degraded.add('stale_stats' if stale else 'missing_stats')
+        print(f"Serving cached stats for {len(stale)} of {len(player_ids)} players whose fetch failed")
+        return stale
+    
+    def _store_stats(self, stats_by_player: Dict[int, Dict[str, Any]], stat_type: str,
+                     player_teams: Optional[Dict[int, Any]] = None):
+        """Record freshly fetched stats for later runs
+        
+        Stat lines of players whose team is mid-game are not persisted: cached after
+        the game's start, they would pass as fresh once it goes final. Players with no
+        known team are held back too while any game on the slate is in progress.
+        """
+        self._remember_stats(stats_by_player, stat_type)
+        if self.stats_cache:
+            playing = self._teams_in_progress()
+            if playing:
+                player_teams = player_teams or {}
+                stats_by_player = {
+                    pid: stats for pid, stats in stats_by_player.items()
+                    if pid in player_teams and str(player_teams[pid]) not in playing
+                }
+            self.stats_cache.put_many(stats_by_player, stat_type, self._stats_scope)
+    
+    def _teams_in_progress(self) -> set:
+        """Ids of teams whose game on the slate has started but not gone final"""
+        if self.stats_as_of:
+            # Historical stat lines end before the slate, so no game can change them
+            return set()
+        
+        now = time.time()
+        playing = set()
+        for game in self._slate_games():
+            if game.get('status') in FINAL_STATUSES + UNPLAYED_STATUSES:
+                continue
+            try:
+                started = datetime.fromisoformat(game.get('game_datetime', '').replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                continue
+            # The pinned schedule may lag behind, so a game past its start time counts as started
+            if started <= now:
+                playing.update({str(game.get('home_id')), str(game.get('away_id'))})
+        return playing
+    
+    def _remember_stats(self, stats_by_player: Dict[int, Dict[str, Any]], stat_type: str):
+        """Keep stats for the next incremental run"""
+        if self._stats_memo is not None:
+            self._stats_memo.update(((stat_type, pid), stats) for pid, stats in stats_by_player.items())
+    
+    def _stats_fresh_after(self, player_teams: Dict[int, Any]) -> Dict[int, float]:
+        """Map players to the start time of today's finished game for their team
+        
+        Stats cached before such a game started are missing its at-bats and must be refetched.
+        """
+        if not player_teams:
+            return {}
+        
         try:
-            url = f"https://statsapi.mlb.com/api/v1/people/{player_id}/stats?stats=season&group={stat_type}&season={self.current_season}"
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+            final_starts = {}
+            for game in self._slate_games():
+                if game.get('status') not in FINAL_STATUSES:
+                    continue
+                started = datetime.fromisoformat(game.get('game_datetime', '').replace('Z', '+00:00')).timestamp()
+                for team_id in (game.get('home_id'), game.get('away_id')):
+                    final_starts[str(team_id)] = max(started, final_starts.get(str(team_id), 0))
             
-            response = requests.get(url, headers=headers, timeout=10)
+            return {pid: final_starts[str(team)] for pid, team in player_teams.items() if str(team) in final_starts}
+        except Exception:
+            return {}
+    
+    def _stats_hydration_range(self) -> str:
+        """Stats hydration type: the live season, or the season up to stats_as_of"""
+        as_of = self.stats_as_of
+        if as_of:
+            return f"type=[byDateRange],startDate={self.current_season}-01-01,endDate={as_of.isoformat()},season={self.current_season}"
+        return f"type=[season],season={self.current_season}"
+    
+    async def _afetch_stats_chunk(self, player_ids: List[int], stat_type: str) -> Optional[Dict[int, Dict[str, Any]]]:
+        """Fetch season stats for one chunk of players in a single request; None if the request failed"""
+        try:
+            response = await self._aget(self._stats_url(player_ids, stat_type), 'people_stats')
             
             if response.status_code == 200:
-                data = response.json()
-                if 'stats' in data and data['stats']:
-                    for stat_group in data['stats']:
-                        splits = stat_group.get('splits', [])
-                        for split in splits:
-                            return split.get('stat', {})
-            return {}
+                return self._parse_stats(response.json())
+            return None
         except Exception:
-            return {}
+            return None
+    
+    def _stats_url(self, player_ids: List[int], stat_type: str) -> str:
+        ids = ','.join(str(pid) for pid in player_ids)
+        return (f"https://statsapi.mlb.com/api/v1/people?personIds={ids}"
+                f"&hydrate=stats(group=[{stat_type}],{self._stats_hydration_range()})")
+    
+    @staticmethod
+    def _parse_stats(data: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """Map player id -> stat line (only STAT_FIELDS) from a hydrated people response"""
+        chunk_stats = {}
+        for person in data.get('people', []):
+            for stat_group in person.get('stats', []):
+                splits = stat_group.get('splits', [])
+                if splits:
+                    stat = splits[0].get('stat', {})
+                    chunk_stats[person['id']] = {field: stat[field] for field in STAT_FIELDS if field in stat}
+                    break
+        return chunk_stats
     
-    def get_batters_from_todays_teams(self, team_ids: set) -> List[Dict[str, Any]]:
+    def get_team_roster(self, team_id: int) -> Optional[Dict[str, Any]]:
+        return self._run(self.aget_team_roster(team_id))
+    
+    async def aget_team_roster(self, team_id: int) -> Optional[Dict[str, Any]]:
+        """Get the active roster payload for a team"""
+        try:
+            response = await self._aget(self._roster_url(team_id), 'roster')
+            
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception:
+            return None
+    
+    def _roster_url(self, team_id: int) -> str:
+        roster_url = f"https://statsapi.mlb.com/api/v1/teams/{team_id}/roster/Active"
+        if self.game_date:
+            roster_url += f"?date={self.game_date.isoformat()}"
+        return roster_url
+    
+    async def _aget_team_roster_memoized(self, team_id: int) -> Optional[Dict[str, Any]]:
+        """Get a team's roster, reusing the one from the previous run when incremental"""
+        if self._rosters_memo is None:
+            return await self.aget_team_roster(team_id)
+        
+        roster = self._rosters_memo.get(team_id)
+        if roster is None:
+            roster = await self.aget_team_roster(team_id)
+            if roster is not None:
+                roster = self._rosters_memo[team_id] = self._compact_roster(roster)
+        return roster
+    
+    @staticmethod
+    def _compact_roster(roster_data: Dict[str, Any]) -> Dict[str, Any]:
+        """A roster payload cut down to what _roster_candidates reads, for keeping between runs"""
+        return {'roster': [
+            {'person': {'id': player['person']['id'], 'fullName': player['person']['fullName']},
+             'position': {'abbreviation': player.get('position', {}).get('abbreviation', 'N/A')}}
+            for player in roster_data.get('roster', [])
+            if 'id' in player.get('person', {}) and 'fullName' in player['person']
+        ]}
+    
+    def _select_teams(self, team_ids: Iterable) -> List:
+        """The teams whose batters are rated, capped at max_teams"""
+        selected_teams = [team_id for team_id in team_ids if team_id]
+        if self.max_teams is not None:
+            selected_teams = selected_teams[:self.max_teams]  # Limit teams for performance
+        return selected_teams
+    
+    def get_batters_from_todays_teams(self, team_ids: set) -> List[Batter]:
+        return self._run(self.aget_batters_from_todays_teams(team_ids))
+    
+    async def aget_batters_from_todays_teams(self, team_ids: set) -> List[Batter]:
         """Get batters from teams playing today"""
-        batters = []
+        selected_teams = self._select_teams(team_ids)
+        rosters = await self._gather(self._aget_team_roster_memoized(team_id) for team_id in selected_teams)
         
-        for team_id in list(team_ids)[:10]:  # Limit to 10 teams for performance
-            try:
-                roster_url = f"https://statsapi.mlb.com/api/v1/teams/{team_id}/roster/Active"
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                
-                response = requests.get(roster_url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    roster_data = response.json()
-                    roster = roster_data.get('roster', [])
+        # Collect every non-pitcher up front so stats can be fetched in a few batched requests
+        team_candidates = self._roster_candidates(selected_teams, rosters)
+        player_teams = {player_id: team_id for team_id, candidates in team_candidates for player_id, _, _ in candidates}
+        stats_by_player = await self.aget_players_season_stats(player_teams, 'hitting', player_teams)
+        return self._build_batters(team_candidates, stats_by_player)
+    
+    @staticmethod
+    def _roster_candidates(team_ids: List, rosters: List[Optional[Dict[str, Any]]]) -> List[tuple]:
+        """(team id, [(player id, name, position), ...]) for every non-pitcher on the fetched rosters"""
+        team_candidates = []
+        for team_id, roster_data in zip(team_ids, rosters):
+            if not roster_data:
+                continue
+            
+            candidates = []
+            for player in roster_data.get('roster', []):
+                try:
+                    player_info = player['person']
+                    position = player.get('position', {}).get('abbreviation', 'N/A')
                     
-                    team_info = roster_data.get('teamId')
+                    # Skip pitchers
+                    if position in ['P', 'RP', 'SP']:
+                        continue
                     
-                    batter_count = 0
-                    for player in roster:
-                        if batter_count >= 3:  # 3 batters per team
-                            break
-                            
-                        player_info = player['person']
-                        player_id = player_info['id']
-                        position = player.get('position', {}).get('abbreviation', 'N/A')
-                        
-                        # Skip pitchers
-                        if position in ['P', 'RP', 'SP']:
-                            continue
+                    candidates.append((player_info['id'], player_info['fullName'], position))
+                except Exception:
+                    continue
+            team_candidates.append((team_id, candidates))
+        return team_candidates
+    
+    def _build_batters(self, team_candidates: List[tuple], stats_by_player: Dict[int, Dict[str, Any]]) -> List[Batter]:
+        """Batter records for the first qualifying candidates of each team"""
+        batters = []
+        for team_id, candidates in team_candidates:
+            batter_count = 0
+            for player_id, full_name, position in candidates:
+                if self.batters_per_team is not None and batter_count >= self.batters_per_team:
+                    break
+                
+                stats = stats_by_player.get(player_id)
+                if stats:
+                    at_bats = stats.get('atBats', 0)
+                    strikeouts = stats.get('strikeOuts', 0)
+                    
+                    if at_bats >= 50:  # Lower threshold for current season
+                        strikeout_rate = round((strikeouts / at_bats) * 100, 2) if at_bats > 0 else 0
                         
-                        # Get player stats
-                        stats = self.get_player_season_stats(player_id, 'hitting')
-                        if stats:
-                            at_bats = stats.get('atBats', 0)
-                            strikeouts = stats.get('strikeOuts', 0)
-                            
-                            if at_bats >= 50:  # Lower threshold for current season
-                                strikeout_rate = round((strikeouts / at_bats) * 100, 2) if at_bats > 0 else 0
-                                
-                                batters.append({
-                                    'player_id': player_id,
-                                    'name': player_info['fullName'],
-                                    'team': f"Team {team_id}",
-                                    'team_abbreviation': str(team_id),
-                                    'position': position,
-                                    'at_bats': at_bats,
-                                    'strikeouts': strikeouts,
-                                    'strikeout_rate': strikeout_rate
-                                })
-                                batter_count += 1
-            except Exception:
-                continue
+                        batters.append(Batter(
+                            player_id=player_id,
+                            name=full_name,
+                            team=f"Team {team_id}",
+                            team_abbreviation=str(team_id),
+                            position=position,
+                            at_bats=at_bats,
+                            strikeouts=strikeouts,
+                            strikeout_rate=strikeout_rate
+                        ))
+                        batter_count += 1
         
         return batters
     
-    def fetch_current_pitchers(self) -> List[Dict[str, Any]]:
-        """Fetch real 2025 pitcher data from MLB StatsAPI"""
+    def lookup_player_id(self, pitcher_name: str) -> Optional[int]:
+        """Resolve a player name to an MLB player id, consulting the local name index first"""
+        cached_id = self.stats_cache.get_player_id(pitcher_name) if self.stats_cache else _player_name_index.get(pitcher_name.lower())
+        self.metrics.record_cache('player_names', hits=1 if cached_id else 0, misses=0 if cached_id else 1)
+        if cached_id:
+            return cached_id
+        
+        try:
+            pitcher_lookup = mlb.lookup_player(pitcher_name)
+            if pitcher_lookup:
+                player_id = pitcher_lookup[0]['id']
+                self._remember_player_ids({pitcher_name: player_id})
+                return player_id
+            return None
+        except Exception:
+            return None
+    
+    def _remember_player_ids(self, ids_by_name: Dict[str, int]):
+        """Add resolved name -> id pairs to the local name index"""
+        if self.stats_cache:
+            self.stats_cache.put_player_ids(ids_by_name)
+        else:
+            _player_name_index.update((name.lower(), player_id) for name, player_id in ids_by_name.items())
+    
+    def fetch_current_pitchers(self, games: Optional[List[Dict]] = None) -> List[Pitcher]:
+        return self._run(self.afetch_current_pitchers(games))
+    
+    async def afetch_current_pitchers(self, games: Optional[List[Dict]] = None) -> List[Pitcher]:
+        """Fetch real 2025 pitcher data from MLB StatsAPI (for today's games, or only the given games)"""
         try:
             print("Fetching real 2025 pitcher data from MLB StatsAPI...")
             
             # Get today's probable pitchers first
-            today_games = mlb.schedule(date=date.today().strftime('%m/%d/%Y'))
-            probable_pitchers = []
+            today_games = await self.aget_todays_schedule() if games is None else games
+            candidates = await asyncio.to_thread(self._pitcher_candidates, today_games)
             
-            if today_games:
-                for game in today_games:
-                    home_pitcher_name = game.get('home_probable_pitcher', '')
-                    away_pitcher_name = game.get('away_probable_pitcher', '')
-                    
-                    for pitcher_name, is_home in [(home_pitcher_name, True), (away_pitcher_name, False)]:
-                        if pitcher_name and pitcher_name != 'TBD':
-                            try:
-                                # Look up pitcher by name
-                                pitcher_lookup = mlb.lookup_player(pitcher_name)
-                                if pitcher_lookup:
-                                    player_id = pitcher_lookup[0]['id']
-                                    
-                                    # Get real pitching statistics
-                                    stats = self.get_player_season_stats(player_id, 'pitching')
-                                    if stats:
-                                        batters_faced = stats.get('battersFaced', 0)
-                                        strikeouts = stats.get('strikeOuts', 0)
-                                        
-                                        if batters_faced >= 20:  # Lower threshold for current season
-                                            strikeout_rate = round((strikeouts / batters_faced) * 100, 2)
-                                            
-                                            probable_pitchers.append({
-                                                'player_id': player_id,
-                                                'name': pitcher_name,
-                                                'team': game['home_name'] if is_home else game['away_name'],
-                                                'team_abbreviation': str(game.get('home_id', 'UNK') if is_home else game.get('away_id', 'UNK')),
-                                                'opponent': game['away_name'] if is_home else game['home_name'],
-                                                'opponent_abbreviation': str(game.get('away_id', 'UNK') if is_home else game.get('home_id', 'UNK')),
-                                                'game_time': game.get('game_datetime', ''),
-                                                'batters_faced': batters_faced,
-                                                'strikeouts': strikeouts,
-                                                'strikeout_rate': strikeout_rate,
-                                                'is_home': is_home
-                                            })
-                            except Exception:
-                                continue
+            # Fall back to a (blocking) name lookup only for starters the schedule did not identify
+            player_ids = await self._gather(
+                self._resolved(player_id) if player_id else asyncio.to_thread(self.lookup_player_id, name)
+                for _, name, _, player_id in candidates
+            )
+            stats_by_player = await self.aget_players_season_stats(
+                player_ids, 'pitching', self._pitcher_teams(candidates, player_ids)
+            )
+            probable_pitchers = self._build_pitchers(candidates, player_ids, stats_by_player)
             
             print(f"Found {len(probable_pitchers)} starting pitchers with real 2025 MLB data")
             return probable_pitchers
             
         except Exception as e:
             print(f"Error fetching pitcher data: {e}")
+            self.metrics.record_error('pitchers')
             return []
     
-    def get_todays_matchups(self, pitchers: List[Dict], batters: List[Dict]) -> List[Dict[str, Any]]:
-        """Create matchups based on today's actual games"""
+    def _pitcher_candidates(self, today_games: List[Dict]) -> List[tuple]:
+        """(game, name, is_home, player id or None) for every announced probable starter"""
+        candidates = []
+        if today_games:
+            for game in today_games:
+                for side, is_home in [('home', True), ('away', False)]:
+                    pitcher_name = game.get(f'{side}_probable_pitcher', '')
+                    if pitcher_name and pitcher_name != 'TBD':
+                        candidates.append((game, pitcher_name, is_home, game.get(f'{side}_probable_pitcher_id')))
+        
+        # Probable pitcher ids come hydrated with the schedule; keep them for name lookups too
+        self._remember_player_ids({name: player_id for _, name, _, player_id in candidates if player_id})
+        return candidates
+    
+    @staticmethod
+    def _pitcher_teams(candidates: List[tuple], player_ids: List[Optional[int]]) -> Dict[int, Any]:
+        return {
+            player_id: game.get('home_id') if is_home else game.get('away_id')
+            for (game, _, is_home, _), player_id in zip(candidates, player_ids) if player_id
+        }
+    
+    @staticmethod
+    def _build_pitchers(candidates: List[tuple], player_ids: List[Optional[int]],
+                        stats_by_player: Dict[int, Dict[str, Any]]) -> List[Pitcher]:
+        """Pitcher records for the starters with enough batters faced"""
+        probable_pitchers = []
+        for (game, pitcher_name, is_home, _), player_id in zip(candidates, player_ids):
+            try:
+                stats = stats_by_player.get(player_id)
+                if player_id and stats:
+                    batters_faced = stats.get('battersFaced', 0)
+                    strikeouts = stats.get('strikeOuts', 0)
+                    
+                    if batters_faced >= 20:  # Lower threshold for current season
+                        strikeout_rate = round((strikeouts / batters_faced) * 100, 2)
+                        
+                        probable_pitchers.append(Pitcher(
+                            player_id=player_id,
+                            name=pitcher_name,
+                            team=game['home_name'] if is_home else game['away_name'],
+                            team_abbreviation=str(game.get('home_id', 'UNK') if is_home else game.get('away_id', 'UNK')),
+                            opponent=game['away_name'] if is_home else game['home_name'],
+                            opponent_abbreviation=str(game.get('away_id', 'UNK') if is_home else game.get('home_id', 'UNK')),
+                            game_time=game.get('game_datetime', ''),
+                            batters_faced=batters_faced,
+                            strikeouts=strikeouts,
+                            strikeout_rate=strikeout_rate,
+                            is_home=is_home
+                        ))
+            except Exception:
+                continue
+        return probable_pitchers
+    
+    def get_todays_matchups(self, pitchers: List[Pitcher], batters: List[Batter],
+                            games: Optional[List[Dict]] = None) -> List[Matchup]:
+        """Create matchups based on today's actual games (or only the given games)"""
         try:
             print("Creating matchups based on today's games...")
             
+            if games is not None and not games:
+                return []
+            
             # Get today's games
-            today_games = mlb.schedule(date=date.today().strftime('%m/%d/%Y'))
-            matchups = []
+            today_games = self.get_todays_schedule() if games is None else games
             
             if not today_games:
                 print("No games today, creating team-based matchups")
                 return self.create_team_matchups(pitchers, batters)
             
+            # Index pitchers by numeric team id once, then join games to rosters by exact key
+            pitchers_by_team = self.index_by_team(pitchers)
+            game_pitchers = []
+            
             # Create matchups based on actual games
             for game in today_games:
                 home_team = game.get('home_name', '')
                 away_team = game.get('away_name', '')
-                home_id = str(game.get('home_id', ''))
-                away_id = str(game.get('away_id', ''))
-                
-                # Find pitchers for this game
-                home_pitcher = None
-                away_pitcher = None
+                home_id = str(game.get('home_id') or '')
+                away_id = str(game.get('away_id') or '')
+                game_time = game.get('game_datetime', '')
                 
-                for pitcher in pitchers:
-                    # Match by team name or abbreviation
-                    if any(team in pitcher['team'] for team in [home_team, home_id]):
-                        home_pitcher = pitcher.copy()
-                        home_pitcher['opponent'] = away_team
-                        home_pitcher['opponent_abbreviation'] = away_id
-                        home_pitcher['is_home'] = True
-                        home_pitcher['game_time'] = game.get('game_datetime', '')
-                    elif any(team in pitcher['team'] for team in [away_team, away_id]):
-                        away_pitcher = pitcher.copy()
-                        away_pitcher['opponent'] = home_team
-                        away_pitcher['opponent_abbreviation'] = home_id
-                        away_pitcher['is_home'] = False
-                        away_pitcher['game_time'] = game.get('game_datetime', '')
+                if not home_id or not away_id:
+                    continue
                 
-                # Create matchups for this game
-                if home_pitcher:
-                    opposing_batters = [b for b in batters if any(team in b['team'] for team in [away_team, away_id])]
-                    for batter in opposing_batters[:3]:  # Top 3 batters per team
-                        matchups.append(self.create_matchup(home_pitcher, batter, f"{away_team} @ {home_team}"))
+                # Find pitchers for this game
+                home_pitcher = self._pitcher_for_game(pitchers_by_team.get(home_id), game_time)
+                away_pitcher = self._pitcher_for_game(pitchers_by_team.get(away_id), game_time)
                 
-                if away_pitcher:
-                    opposing_batters = [b for b in batters if any(team in b['team'] for team in [home_team, home_id])]
-                    for batter in opposing_batters[:3]:
-                        matchups.append(self.create_matchup(away_pitcher, batter, f"{away_team} @ {home_team}"))
+                for pitcher in (home_pitcher, away_pitcher):
+                    if pitcher:
+                        game_pitchers.append((pitcher, f"{away_team} @ {home_team}"))
             
-            # Sort by whiff watch rating
-            matchups.sort(key=lambda x: x['whiff_watch_rating'], reverse=True)
+            # Pair each starter with the top batters of the opposing team, rated and sorted in one pass
+            pitcher_frame = rating_engine.players_frame([pitcher for pitcher, _ in game_pitchers])
+            pitcher_frame['opponent'] = [pitcher.opponent_abbreviation for pitcher, _ in game_pitchers]
+            pairs = rating_engine.rate_pairs(
+                rating_engine.pair_by_opponent(pitcher_frame, rating_engine.players_frame(batters), self.batters_per_team)
+            )
+            matchups = self._matchups_from_pairs(
+                pairs, [pitcher for pitcher, _ in game_pitchers], batters, lambda p, b: game_pitchers[p][1]
+            )
             
             print(f"Created {len(matchups)} real game matchups")
             return matchups
             
         except Exception as e:
             print(f"Error creating today's matchups: {e}")
+            self.metrics.record_error('matchups')
             return self.create_team_matchups(pitchers, batters)
     
-    def create_team_matchups(self, pitchers: List[Dict], batters: List[Dict]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def index_by_team(players: List[Any]) -> Dict[str, List[Any]]:
+        """Group player records by their numeric team id (stored as team_abbreviation), preserving order"""
+        index = {}
+        for player in players:
+            index.setdefault(str(player.team_abbreviation), []).append(player)
+        return index
+    
+    @staticmethod
+    def _pitcher_for_game(team_pitchers: Optional[List[Pitcher]], game_time: str) -> Optional[Pitcher]:
+        """Pick a team's probable starter for a game, telling doubleheader games apart by start time
+        
+        Starters are built from the same schedule, so None means this game's starter was not rated.
+        """
+        if not team_pitchers:
+            return None
+        for pitcher in team_pitchers:
+            if pitcher.game_time == game_time:
+                return pitcher
+        return None
+    
+    def create_team_matchups(self, pitchers: List[Pitcher], batters: List[Batter]) -> List[Matchup]:
         """Create general team-based matchups"""
-        matchups = []
+        top_pitchers = pitchers[:10]  # Top 10 pitchers
         
-        for pitcher in pitchers[:10]:  # Top 10 pitchers
-            # Find batters from different teams
-            opposing_batters = [b for b in batters if b['team'] != pitcher['team']][:20]
-            
-            for batter in opposing_batters:
-                matchups.append(self.create_matchup(pitcher, batter, f"{batter['team']} vs {pitcher['team']}"))
+        # Pair each pitcher with the first 20 batters from different teams
+        pairs = rating_engine.rate_pairs(rating_engine.pair_across_teams(
+            rating_engine.players_frame(top_pitchers, 'team'), rating_engine.players_frame(batters, 'team'), 20
+        ))
         
-        matchups.sort(key=lambda x: x['whiff_watch_rating'], reverse=True)
-        return matchups[:50]  # Top 50 matchups
+        return self._matchups_from_pairs(
+            pairs.head(50), top_pitchers, batters,  # Top 50 matchups
+            lambda p, b: f"{batters[b].team} vs {top_pitchers[p].team}"
+        )
     
-    def create_matchup(self, pitcher: Dict, batter: Dict, game_info: str) -> Dict[str, Any]:
+    def _matchups_from_pairs(self, pairs: pd.DataFrame, pitchers: List[Pitcher], batters: List[Batter],
+                             game_info: Callable[[int, int], str]) -> List[Matchup]:
+        """Build matchups from rated pairs, referencing the shared player records"""
+        return [
+            Matchup(pitchers[p], batters[b], game_info(p, b), rating, level)
+            for p, b, rating, level in zip(
+                pairs['idx_pitcher'].tolist(), pairs['idx_batter'].tolist(),
+                pairs['rating'].tolist(), pairs['level'].tolist()
+            )
+        ]
+    
+    def create_matchup(self, pitcher: Pitcher, batter: Batter, game_info: str) -> Matchup:
         """Create a single matchup"""
-        combined_rating = round(batter['strikeout_rate'] + pitcher['strikeout_rate'], 2)
+        combined_rating = round(batter.strikeout_rate + pitcher.strikeout_rate, 2)
         
-        return {
-            'matchup_id': f"{pitcher['player_id']}_{batter['player_id']}",
-            'game_info': game_info,
-            'pitcher': pitcher,
-            'batter': batter,
-            'whiff_watch_rating': combined_rating,
-            'rating_level': self.get_rating_level(combined_rating)
-        }
+        return Matchup(pitcher, batter, game_info, combined_rating, self.get_rating_level(combined_rating))
     
     def get_rating_level(self, rating: float) -> str:
         """Categorize whiff watch rating into levels"""
@@ -316,88 +958,370 @@ class WhiffWatcher:
         """
         Main method to generate complete whiff watch data using Baseball Savant
         """
+        return self._run(self.agenerate_whiff_watch_data())
+    
+    async def agenerate_whiff_watch_data(self) -> Dict[str, Any]:
+        """generate_whiff_watch_data() for callers already running an event loop"""
+        self.metrics = Metrics() if self.collect_metrics else NullMetrics()
+        with self.metrics.stage('total'):
+            data = await self._agenerate_whiff_watch_data()
+        
+        if self.metrics.enabled:
+            data['metrics'] = self.metrics.to_dict()
+        return data
+    
+    @staticmethod
+    def _game_signature(game: Dict[str, Any]) -> tuple:
+        """The parts of a scheduled game whose change means its players need fresh data"""
+        return (game.get('status'), game.get('home_probable_pitcher_id'), game.get('away_probable_pitcher_id'),
+                game.get('home_probable_pitcher'), game.get('away_probable_pitcher'))
+    
+    @staticmethod
+    def _game_keys(game: Dict[str, Any]) -> set:
+        """Keys identifying a game's matchups by pitcher team and start time"""
+        return {(str(game.get(side)), game.get('game_datetime', '')) for side in ('home_id', 'away_id')}
+    
+    def _start_incremental_run(self) -> Optional[Dict[str, Any]]:
+        """Work out what changed since the last run; returns the previous state, or None for a full run"""
+        state = self._incremental_state
+        if (not self.incremental or state is None or not self._run_schedule or state['date'] != self.slate_date
+                or time.monotonic() - state['created'] > INCREMENTAL_MAX_AGE):
+            self._dirty_teams = None
+            self._rosters_memo = {} if self.incremental else None
+            self._stats_memo = {} if self.incremental else None
+            return None
+        
+        self._dirty_teams = set()
+        self._changed_games = []
+        for game in self._slate_games():
+            if state['games'].get(game.get('game_id')) != self._game_signature(game):
+                self._changed_games.append(game)
+                # A new or changed status means these teams may have played since the last run
+                if state['games'].get(game.get('game_id'), (None,))[0] != game.get('status'):
+                    self._dirty_teams.update({str(game.get('home_id')), str(game.get('away_id'))})
+        
+        # Doubleheader partners share batters with a dirty team, so rebuild them too
+        self._changed_games += [
+            game for game in self._slate_games()
+            if game not in self._changed_games and {str(game.get('home_id')), str(game.get('away_id'))} & self._dirty_teams
+        ]
+        self._rosters_memo = state['rosters']
+        self._stats_memo = state['stats']
+        return state
+    
+    def stream_whiff_watch_data(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate whiff watch data game by game, as ('game', game_event) pairs followed
+        by a final ('complete', payload) pair
+        
+        Games are resolved concurrently and yielded as soon as each one's starters and
+        batters are rated, so the first result costs a single game's fetches. The final
+        payload has the same shape as generate_whiff_watch_data(), but the league-leaders
+        fallback is not used and incremental state is neither read nor updated.
+        """
+        # The loop only runs while the consumer waits for the next event
+        loop, executor = self._new_loop()
+        events = self.astream_whiff_watch_data()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(events.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(events.aclose())
+            self._close_loop(loop, executor)
+    
+    async def astream_whiff_watch_data(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """stream_whiff_watch_data() for callers already running an event loop"""
+        self.metrics = Metrics() if self.collect_metrics else NullMetrics()
+        with self.metrics.stage('total'):
+            outcome = {}
+            try:
+                async for event in self._astream_whiff_watch_data(outcome):
+                    yield event
+                data = outcome['payload']
+            except Exception as e:
+                print(f"Error streaming whiff watch data: {e}")
+                self.metrics.record_error('generate')
+                data = self._error_payload(e)
+        
+        if self.metrics.enabled:
+            data['metrics'] = self.metrics.to_dict()
+        yield 'complete', data
+    
+    async def _astream_whiff_watch_data(self, outcome: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield game events; the final payload is left in outcome['payload']"""
+        print("Streaming whiff watch data game by game...")
+        self._begin_run()
+        self._dirty_teams = None
+        self._rosters_memo = None
+        self._stats_memo = None
+        
+        with self.metrics.stage('schedule'):
+            games = await self.aget_todays_schedule()
+        if not games:
+            # Nothing to stream per game; the batch pipeline handles the no-games fallback
+            outcome['payload'] = await self._agenerate_whiff_watch_data()
+            return
+        
+        # Same team selection as fetch_current_batters, so capped slates rate the same teams
+        selected_teams = self._select_teams(self._todays_team_ids())
+        
+        positions = {
+            asyncio.ensure_future(self._aresolve_game(game, set(selected_teams))): position
+            for position, game in enumerate(games)
+        }
+        pending = set(positions)
+        resolved = {}
+        try:
+            while pending:
+                timeout = None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.budget_exceeded = True
+                    print(f"Latency budget exhausted, dropping {len(pending)} pending games")
+                    break
+                for task in sorted(done, key=positions.get):
+                    result = resolved[positions[task]] = task.result()
+                    yield 'game', self.game_event(self.game_entry(result['game']), matchup_dicts(result['matchups']))
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        # Reassemble in schedule order so the payload matches a batch run
+        results = [resolved[position] for position in sorted(resolved)]
+        batters_by_team = {}
+        for result in results:
+            for team_id, team_batters in self.index_by_team(result['batters']).items():
+                batters_by_team.setdefault(team_id, team_batters)
+        batters = [batter for team_id in selected_teams for batter in batters_by_team.get(str(team_id), [])]
+        pitchers = [pitcher for result in results for pitcher in result['pitchers']]
+        whiff_ratings = [matchup for result in results for matchup in result['matchups']]
+        whiff_ratings.sort(key=lambda x: x.whiff_watch_rating, reverse=True)
+        
+        if not batters:
+            raise Exception("No batter data available from Baseball Savant")
+        
+        if not pitchers:
+            raise Exception("No pitcher data available from Baseball Savant")
+        
+        if not whiff_ratings:
+            raise Exception("No matchups could be created")
+        
+        with self.metrics.stage('summary'):
+            summary = self._summarize(whiff_ratings)
+        outcome['payload'] = self._build_payload(batters, pitchers, whiff_ratings, summary)
+    
+    @staticmethod
+    def game_entry(game: Dict[str, Any]) -> Dict[str, Any]:
+        """A scheduled game as listed under the payload's games"""
+        return {
+            'game_id': game.get('game_id'),
+            'game_info': f"{game.get('away_name', '')} @ {game.get('home_name', '')}",
+            'game_time': game.get('game_datetime', ''),
+            'status': game.get('status', ''),
+            'home_id': game.get('home_id'),
+            'away_id': game.get('away_id')
+        }
+    
+    @staticmethod
+    def game_event(entry: Dict[str, Any], matchups: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """A streamed game: its identity and status plus its rated matchups"""
+        return {
+            'game_id': entry['game_id'],
+            'game_info': entry['game_info'],
+            'game_time': entry['game_time'],
+            'status': entry['status'],
+            'matchups': matchups
+        }
+    
+    @classmethod
+    def game_events(cls, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """A payload's matchups regrouped into the game events a stream yields, in schedule order"""
+        by_pitcher_game = {}
+        for matchup in data.get('whiff_watch_ratings', []):
+            key = (str(matchup['pitcher']['team_abbreviation']), matchup['pitcher'].get('game_time', ''))
+            by_pitcher_game.setdefault(key, []).append(matchup)
+        
+        events = []
+        for entry in data.get('games', []):
+            matchups = [
+                matchup for team_id in (entry['home_id'], entry['away_id'])
+                for matchup in by_pitcher_game.get((str(team_id), entry['game_time']), [])
+            ]
+            matchups.sort(key=lambda x: x['whiff_watch_rating'], reverse=True)
+            events.append(cls.game_event(entry, matchups))
+        return events
+    
+    async def _aresolve_game(self, game: Dict[str, Any], selected_teams: set) -> Dict[str, Any]:
+        """Fetch one game's starters and batters and rate its matchups"""
+        try:
+            with self.metrics.stage('batters'):
+                batters = await self.aget_batters_from_todays_teams(
+                    [team_id for team_id in (game.get('home_id'), game.get('away_id')) if team_id in selected_teams]
+                )
+            with self.metrics.stage('pitchers'):
+                pitchers = await self.afetch_current_pitchers([game])
+            with self.metrics.stage('matchups'):
+                matchups = self.get_todays_matchups(pitchers, batters, [game]) if pitchers and batters else []
+        except Exception as e:
+            print(f"Error resolving game {game.get('game_id')}: {e}")
+            self.metrics.record_error('game')
+            batters, pitchers, matchups = [], [], []
+        return {'game': game, 'batters': batters, 'pitchers': pitchers, 'matchups': matchups}
+    
+    def _begin_run(self):
+        """Reset per-run state; one schedule snapshot is pinned for the whole run so every stage agrees"""
+        self._run_schedule = None
+        self._deadline = time.monotonic() + self.latency_budget if self.latency_budget else None
+        self.budget_exceeded = False
+        self._degraded = set()
+        self._stale_stats_served = 0
+    
+    async def _agenerate_whiff_watch_data(self) -> Dict[str, Any]:
         try:
             print("Starting whiff watch data generation with Baseball Savant data...")
             
-            # Fetch real data from Baseball Savant
-            batters = self.fetch_current_batters()
-            pitchers = self.fetch_current_pitchers()
-            
-            if not batters:
-                raise Exception("No batter data available from Baseball Savant")
-            
-            if not pitchers:
-                raise Exception("No pitcher data available from Baseball Savant")
+            self._begin_run()
             
-            # Create accurate matchups
-            whiff_ratings = self.get_todays_matchups(pitchers, batters)
+            with self.metrics.stage('schedule'):
+                try:
+                    await self.aget_todays_schedule()
+                except Exception as e:
+                    # Each stage retries and handles a missing schedule on its own
+                    print(f"Error fetching schedule: {e}")
+                    self.metrics.record_error('schedule')
             
-            if not whiff_ratings:
-                raise Exception("No matchups could be created")
+            previous = self._start_incremental_run()
             
-            # Generate summary statistics
-            total_ratings = len(whiff_ratings)
-            avg_rating = round(sum(r['whiff_watch_rating'] for r in whiff_ratings) / total_ratings, 2) if total_ratings > 0 else 0
-            max_rating = max((r['whiff_watch_rating'] for r in whiff_ratings), default=0)
-            min_rating = min((r['whiff_watch_rating'] for r in whiff_ratings), default=0)
+            # Fetch real data from Baseball Savant
+            with self.metrics.stage('batters'):
+                batters = await self.afetch_current_batters()
+            with self.metrics.stage('pitchers'):
+                pitchers = await self.afetch_current_pitchers()
             
-            # Count by rating level
-            rating_counts = {}
-            for rating in whiff_ratings:
-                level = rating['rating_level']
-                rating_counts[level] = rating_counts.get(level, 0) + 1
+            return self._finish_run(batters, pitchers, previous)
             
-            return {
-                'app_name': 'Whiff Watcher',
-                'generated_at': datetime.now().isoformat(),
-                'date': date.today().isoformat(),
-                'season': self.current_season,
-                'data_summary': {
-                    'total_whiff_ratings': total_ratings,
-                    'active_batters_count': len(batters),
-                    'probable_pitchers_count': len(pitchers),
-                    'min_at_bats_requirement': self.min_at_bats,
-                    'average_whiff_rating': avg_rating,
-                    'highest_whiff_rating': max_rating,
-                    'lowest_whiff_rating': min_rating,
-                    'rating_level_counts': rating_counts
+        except Exception as e:
+            print(f"Error generating whiff watch data: {e}")
+            self.metrics.record_error('generate')
+            return self._error_payload(e)
+    
+    def _finish_run(self, batters: List[Batter], pitchers: List[Pitcher], previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rate the fetched players, save incremental state and assemble the payload"""
+        if not batters:
+            raise Exception("No batter data available from Baseball Savant")
+        
+        if not pitchers:
+            raise Exception("No pitcher data available from Baseball Savant")
+        
+        # Create accurate matchups
+        with self.metrics.stage('matchups'):
+            if previous:
+                # Keep matchups of untouched games and rebuild only the changed ones
+                changed_keys = set().union(*(self._game_keys(game) for game in self._changed_games))
+                whiff_ratings = [
+                    m for m in previous['matchups']
+                    if (m.pitcher.team_abbreviation, m.pitcher.game_time) not in changed_keys
+                ]
+                whiff_ratings += self.get_todays_matchups(pitchers, batters, self._changed_games)
+                whiff_ratings.sort(key=lambda x: x.whiff_watch_rating, reverse=True)
+                print(f"Incremental run: rebuilt {len(self._changed_games)} changed games")
+            else:
+                whiff_ratings = self.get_todays_matchups(pitchers, batters)
+        
+        if not whiff_ratings:
+            raise Exception("No matchups could be created")
+        
+        # Generate summary statistics
+        with self.metrics.stage('summary'):
+            summary = self._summarize(whiff_ratings)
+        
+        if self.incremental and self._run_schedule:
+            self._incremental_state = {
+                'date': self.slate_date,
+                'created': previous['created'] if previous else time.monotonic(),
+                'games': {game.get('game_id'): self._game_signature(game) for game in self._run_schedule},
+                'rosters': self._rosters_memo,
+                'stats': self._stats_memo,
+                'matchups': whiff_ratings
+            }
+        
+        return self._build_payload(batters, pitchers, whiff_ratings, summary, previous)
+    
+    @staticmethod
+    def _summarize(whiff_ratings: List[Matchup]) -> Dict[str, Any]:
+        """Summary statistics over a list of rated matchups"""
+        return rating_engine.summarize(pd.DataFrame({
+            'rating': [r.whiff_watch_rating for r in whiff_ratings],
+            'level': [r.rating_level for r in whiff_ratings]
+        }))
+    
+    def _build_payload(self, batters: List[Batter], pitchers: List[Pitcher], whiff_ratings: List[Matchup],
+                       summary: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Assemble the published payload of a successful run; records only become dicts here"""
+        active_batters, probable_pitchers, rated_matchups = payload_lists(batters, pitchers, whiff_ratings)
+        return {
+            'app_name': 'Whiff Watcher',
+            'generated_at': datetime.now().isoformat(),
+            'date': self.slate_date.isoformat(),
+            'season': self.current_season,
+            'data_summary': {
+                'total_whiff_ratings': summary['total_whiff_ratings'],
+                'active_batters_count': len(batters),
+                'probable_pitchers_count': len(pitchers),
+                'min_at_bats_requirement': self.min_at_bats,
+                'average_whiff_rating': summary['average_whiff_rating'],
+                'highest_whiff_rating': summary['highest_whiff_rating'],
+                'lowest_whiff_rating': summary['lowest_whiff_rating'],
+                'rating_level_counts': summary['rating_level_counts']
+            },
+            'whiff_watch_ratings': rated_matchups,
+            'active_batters': active_batters,
+            'probable_pitchers': probable_pitchers,
+            'games': [self.game_entry(game) for game in self._run_schedule or []],
+            'metadata': {
+                'data_source': 'Baseball Savant (Real 2025 Data)',
+                'calculation_method': 'Batter strikeout rate + Pitcher strikeout rate',
+                'strikeout_rate_formula': {
+                    'batter': 'strikeouts / at_bats * 100',
+                    'pitcher': 'strikeouts / batters_faced * 100'
                 },
-                'whiff_watch_ratings': whiff_ratings,
-                'active_batters': batters,
-                'probable_pitchers': pitchers,
-                'metadata': {
-                    'data_source': 'Baseball Savant (Real 2025 Data)',
-                    'calculation_method': 'Batter strikeout rate + Pitcher strikeout rate',
-                    'strikeout_rate_formula': {
-                        'batter': 'strikeouts / at_bats * 100',
-                        'pitcher': 'strikeouts / batters_faced * 100'
-                    },
-                    'last_updated': datetime.now().isoformat(),
-                    'version': '2.0',
-                    'data_season': self.current_season,
-                    'note': 'Real MLB data from Baseball Savant with accurate team matchups'
-                }
+                'last_updated': datetime.now().isoformat(),
+                'version': '2.0',
+                'data_season': self.current_season,
+                'full_slate': self.full_slate,
+                'latency_budget_exceeded': self.budget_exceeded,
+                'degraded': bool(self._degraded) or self.budget_exceeded,
+                'degraded_reasons': sorted(self._degraded | ({'latency_budget'} if self.budget_exceeded else set())),
+                'stale_stats_served': self._stale_stats_served,
+                'incremental': previous is not None,
+                'refreshed_games': len(self._changed_games) if previous else len(self._run_schedule or []),
+                'note': 'Real MLB data from Baseball Savant with accurate team matchups'
             }
-            
-        except Exception as e:
-            error_data = {
-                'app_name': 'Whiff Watcher',
-                'generated_at': datetime.now().isoformat(),
-                'error': True,
-                'error_message': str(e),
-                'error_type': type(e).__name__,
-                'whiff_watch_ratings': [],
-                'active_batters': [],
-                'probable_pitchers': [],
-                'data_summary': {
-                    'total_whiff_ratings': 0,
-                    'active_batters_count': 0,
-                    'probable_pitchers_count': 0,
-                    'error_occurred': True
-                }
+        }
+    
+    @staticmethod
+    def _error_payload(e: Exception) -> Dict[str, Any]:
+        """Payload published when a run fails"""
+        return {
+            'app_name': 'Whiff Watcher',
+            'generated_at': datetime.now().isoformat(),
+            'error': True,
+            'error_message': str(e),
+            'error_type': type(e).__name__,
+            'whiff_watch_ratings': [],
+            'active_batters': [],
+            'probable_pitchers': [],
+            'games': [],
+            'data_summary': {
+                'total_whiff_ratings': 0,
+                'active_batters_count': 0,
+                'probable_pitchers_count': 0,
+                'error_occurred': True
             }
-            print(f"Error generating whiff watch data: {e}")
-            return error_data
+        }
 
 if __name__ == "__main__":
     # Command line execution for testing